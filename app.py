@@ -1,51 +1,80 @@
 # Import Flask for web server, request for form input handling,
-# and render_template_string to render a basic inline HTML page
-from flask import Flask, request, render_template_string, jsonify, session, send_from_directory
+# and stream_template to stream the inline HTML page
+from flask import Flask, Response, request, stream_template, jsonify, session
 import time
 import os
 import uuid
+import hashlib
+import threading
+import queue
+import io
+import csv
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
 from werkzeug.utils import secure_filename
+from flask.json.provider import JSONProvider
+from markupsafe import Markup, escape
+import orjson
 
 # Import OpenAI SDK for calling GPT-4
 import openai
 
-# Import os for accessing environment variables
-import os
-
-# Import dotenv loader to securely pull in secrets from a .env file
-from dotenv import load_dotenv
-
 # Import our custom modules
-from prompt_templates import create_enterprise_query_prompt, ENTERPRISE_EXAMPLE_QUERIES, get_query_suggestions
+from config import config
+from prompt_templates import create_enterprise_query_prompt, create_enterprise_prompt_prefix, ENTERPRISE_EXAMPLE_QUERIES, get_query_suggestions
 from schema_analyzer import SAPSchemaAnalyzer
 from query_planner import SAPQueryPlanner
 from query_executor import SAPQueryExecutor
 from logger_config import SAPDemoLogger
 from report_identifier import SAPReportIdentifier
 from schema_mapper import SAPSchemaMapper
+from upload_store import SAPUploadStore
 import pandas as pd
 import numpy as np
 from typing import Dict, Any
 
-# Load environment variables from .env file into the system
-load_dotenv()
-
-# Set the OpenAI API key from the environment variable
-openai.api_key = os.getenv("OPENAI_API_KEY")
+class ORJSONProvider(JSONProvider):
+    """JSON provider backed by orjson; numpy scalars and arrays serialize natively"""
+    
+    OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS | orjson.OPT_SORT_KEYS
+    
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=str, option=self.OPTIONS).decode()
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+    
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        # Skip the bytes -> str -> bytes round trip of the default response path
+        return self._app.response_class(
+            orjson.dumps(obj, default=str, option=self.OPTIONS), mimetype='application/json'
+        )
 
 # Initialize the Flask app
 app = Flask(__name__)
-app.secret_key = os.getenv("SECRET_KEY", "your-secret-key-here")
+app.json = ORJSONProvider(app)
+app.secret_key = config.secret_key
 
-# Add static file serving
-@app.route('/static/<path:filename>')
-def static_files(filename):
-    return send_from_directory('static', filename)
+# Static files are served by Flask's built-in static route. URLs carry the file's
+# mtime as a version, so browsers can cache them for a year and still pick up edits.
+app.config['SEND_FILE_MAX_AGE_DEFAULT'] = 31536000
+
+@app.url_defaults
+def add_static_version(endpoint, values):
+    if endpoint == 'static' and 'filename' in values:
+        filepath = os.path.join(app.static_folder, values['filename'])
+        try:
+            values['v'] = int(os.path.getmtime(filepath))
+        except OSError:
+            pass
 
 # Configuration
-UPLOAD_FOLDER = 'uploads'
+UPLOAD_FOLDER = config.upload_folder
 ALLOWED_EXTENSIONS = {'csv', 'xlsx', 'xls'}
+ALLOWED_SUFFIXES = tuple('.' + ext for ext in ALLOWED_EXTENSIONS)
 MAX_FILE_SIZE = 100 * 1024 * 1024  # 100MB
+UPLOAD_CHUNK_SIZE = 1 << 20  # 1MB
 
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 app.config['MAX_CONTENT_LENGTH'] = MAX_FILE_SIZE
@@ -59,8 +88,27 @@ schema_mapper = SAPSchemaMapper()
 # Ensure upload directory exists
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
+if not config.openai_api_key:
+    logger.app_logger.warning("OPENAI_API_KEY is not set; AI insights will fail")
+
 def allowed_file(filename):
-    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+    return filename.lower().endswith(ALLOWED_SUFFIXES)
+
+def save_upload(file, filepath: str) -> str:
+    """Write an uploaded file to disk and return the blake2b digest of its contents"""
+    digest = hashlib.blake2b()
+    # Read every chunk into one reusable buffer instead of allocating a bytes object per chunk;
+    # chunk-sized writes pass straight through the file's own buffer
+    buffer = bytearray(UPLOAD_CHUNK_SIZE)
+    view = memoryview(buffer)
+    with open(filepath, 'wb') as out:
+        while True:
+            size = file.stream.readinto(buffer)
+            if not size:
+                break
+            digest.update(view[:size])
+            out.write(view[:size])
+    return digest.hexdigest()
 
 # Define a modern, enterprise-grade HTML template
 HTML_TEMPLATE = """
@@ -70,480 +118,7 @@ HTML_TEMPLATE = """
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <title>SAP Assistant - Powered by ITS Consulting Inc.</title>
-    <style>
-        * {
-            margin: 0;
-            padding: 0;
-            box-sizing: border-box;
-        }
-        
-        body {
-            font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            min-height: 100vh;
-            color: #333;
-        }
-        
-        .container {
-            max-width: 1400px;
-            margin: 0 auto;
-            padding: 20px;
-        }
-        
-        .header {
-            background: rgba(255, 255, 255, 0.95);
-            backdrop-filter: blur(10px);
-            padding: 30px;
-            border-radius: 15px;
-            margin-bottom: 30px;
-            text-align: center;
-            box-shadow: 0 8px 32px rgba(0, 0, 0, 0.1);
-        }
-        
-        .header h1 {
-            color: #2c3e50;
-            font-size: 2.5em;
-            margin-bottom: 10px;
-        }
-        
-        .header p {
-            color: #7f8c8d;
-            font-size: 1.1em;
-        }
-        
-        .main-content {
-            display: grid;
-            grid-template-columns: 1fr 2fr;
-            gap: 30px;
-            margin-bottom: 30px;
-        }
-        
-        .sidebar {
-            background: rgba(255, 255, 255, 0.95);
-            backdrop-filter: blur(10px);
-            padding: 25px;
-            border-radius: 15px;
-            box-shadow: 0 8px 32px rgba(0, 0, 0, 0.1);
-            height: fit-content;
-        }
-        
-        .main-panel {
-            background: rgba(255, 255, 255, 0.95);
-            backdrop-filter: blur(10px);
-            padding: 25px;
-            border-radius: 15px;
-            box-shadow: 0 8px 32px rgba(0, 0, 0, 0.1);
-        }
-        
-        .upload-section {
-            margin-bottom: 30px;
-        }
-        
-        .upload-area {
-            border: 2px dashed #bdc3c7;
-            border-radius: 10px;
-            padding: 40px;
-            text-align: center;
-            transition: all 0.3s ease;
-            cursor: pointer;
-        }
-        
-        .upload-area:hover {
-            border-color: #3498db;
-            background: rgba(52, 152, 219, 0.05);
-        }
-        
-        .upload-area.dragover {
-            border-color: #27ae60;
-            background: rgba(39, 174, 96, 0.1);
-        }
-        
-        .file-input {
-            display: none;
-        }
-        
-        .upload-btn {
-            background: linear-gradient(135deg, #3498db, #2980b9);
-            color: white;
-            padding: 12px 24px;
-            border: none;
-            border-radius: 8px;
-            cursor: pointer;
-            font-size: 16px;
-            transition: transform 0.2s;
-        }
-        
-        .upload-btn:hover {
-            transform: translateY(-2px);
-        }
-        
-        .schema-info {
-            margin-top: 20px;
-            padding: 15px;
-            background: #f8f9fa;
-            border-radius: 8px;
-            border-left: 4px solid #3498db;
-        }
-        
-        .schema-info h3 {
-            color: #2c3e50;
-            margin-bottom: 10px;
-        }
-        
-        .schema-stats {
-            display: grid;
-            grid-template-columns: 1fr 1fr;
-            gap: 10px;
-            margin-top: 15px;
-        }
-        
-        .stat-item {
-            text-align: center;
-            padding: 10px;
-            background: white;
-            border-radius: 6px;
-            box-shadow: 0 2px 4px rgba(0, 0, 0, 0.1);
-        }
-        
-        .stat-number {
-            font-size: 1.5em;
-            font-weight: bold;
-            color: #3498db;
-        }
-        
-        .stat-label {
-            font-size: 0.9em;
-            color: #7f8c8d;
-        }
-        
-        .query-section {
-            margin-bottom: 30px;
-        }
-        
-        .query-form {
-            display: flex;
-            gap: 15px;
-            margin-bottom: 20px;
-        }
-        
-        .query-input {
-            flex: 1;
-            padding: 15px;
-            border: 2px solid #e9ecef;
-            border-radius: 8px;
-            font-size: 16px;
-            transition: border-color 0.3s;
-        }
-        
-        .query-input:focus {
-            outline: none;
-            border-color: #3498db;
-        }
-        
-        .query-btn {
-            background: linear-gradient(135deg, #27ae60, #229954);
-            color: white;
-            padding: 15px 30px;
-            border: none;
-            border-radius: 8px;
-            cursor: pointer;
-            font-size: 16px;
-            transition: transform 0.2s;
-        }
-        
-        .query-btn:hover {
-            transform: translateY(-2px);
-        }
-        
-        .query-btn:disabled {
-            background: #bdc3c7;
-            cursor: not-allowed;
-            transform: none;
-        }
-        
-        .suggestions {
-            margin-top: 20px;
-        }
-        
-        .suggestions h3 {
-            color: #2c3e50;
-            margin-bottom: 15px;
-        }
-        
-        .suggestion-list {
-            list-style: none;
-        }
-        
-        .suggestion-item {
-            padding: 10px 15px;
-            margin-bottom: 8px;
-            background: #f8f9fa;
-            border-radius: 6px;
-            cursor: pointer;
-            transition: background 0.2s;
-            border-left: 3px solid #3498db;
-        }
-        
-        .suggestion-item:hover {
-            background: #e9ecef;
-        }
-        
-        .results-section {
-            margin-top: 30px;
-        }
-        
-        .results-header {
-            display: flex;
-            justify-content: between;
-            align-items: center;
-            margin-bottom: 20px;
-            padding-bottom: 15px;
-            border-bottom: 2px solid #e9ecef;
-        }
-        
-        .results-title {
-            font-size: 1.5em;
-            color: #2c3e50;
-        }
-        
-        .results-meta {
-            display: flex;
-            gap: 20px;
-            color: #7f8c8d;
-            font-size: 0.9em;
-        }
-        
-        .results-table {
-            width: 100%;
-            border-collapse: collapse;
-            background: white;
-            border-radius: 8px;
-            overflow: hidden;
-            box-shadow: 0 4px 6px rgba(0, 0, 0, 0.1);
-        }
-        
-        .results-table th {
-            background: #34495e;
-            color: white;
-            padding: 15px;
-            text-align: left;
-            font-weight: 600;
-        }
-        
-        .results-table td {
-            padding: 12px 15px;
-            border-bottom: 1px solid #e9ecef;
-        }
-        
-        .results-table tr:hover {
-            background: #f8f9fa;
-        }
-        
-        .insights-panel {
-            margin-top: 20px;
-            padding: 20px;
-            background: #e8f5e8;
-            border-radius: 8px;
-            border-left: 4px solid #27ae60;
-        }
-        
-        .insights-panel h3 {
-            color: #27ae60;
-            margin-bottom: 15px;
-        }
-        
-        .insight-item {
-            margin-bottom: 10px;
-            padding-left: 20px;
-            position: relative;
-        }
-        
-        .insight-item:before {
-            content: "•";
-            color: #27ae60;
-            font-weight: bold;
-            position: absolute;
-            left: 0;
-        }
-        
-        .loading {
-            display: none;
-            text-align: center;
-            padding: 40px;
-            color: #7f8c8d;
-        }
-        
-        .loading-spinner {
-            border: 4px solid #f3f3f3;
-            border-top: 4px solid #3498db;
-            border-radius: 50%;
-            width: 40px;
-            height: 40px;
-            animation: spin 1s linear infinite;
-            margin: 0 auto 20px;
-        }
-        
-        @keyframes spin {
-            0% { transform: rotate(0deg); }
-            100% { transform: rotate(360deg); }
-        }
-        
-        .error-message {
-            background: #f8d7da;
-            color: #721c24;
-            padding: 15px;
-            border-radius: 8px;
-            border-left: 4px solid #dc3545;
-            margin: 20px 0;
-        }
-        
-        .success-message {
-            background: #d4edda;
-            color: #155724;
-            padding: 15px;
-            border-radius: 8px;
-            border-left: 4px solid #28a745;
-            margin: 20px 0;
-        }
-        
-        .file-info {
-            background: #e3f2fd;
-            padding: 15px;
-            border-radius: 8px;
-            border-left: 4px solid #2196f3;
-            margin-top: 15px;
-        }
-        
-        .file-info h4 {
-            color: #1976d2;
-            margin-bottom: 10px;
-        }
-        
-        .file-details {
-            display: grid;
-            grid-template-columns: 1fr 1fr;
-            gap: 10px;
-            font-size: 0.9em;
-        }
-        
-        .file-detail {
-            display: flex;
-            justify-content: space-between;
-        }
-        
-        .file-detail strong {
-            color: #1976d2;
-        }
-        
-        @media (max-width: 768px) {
-            .main-content {
-                grid-template-columns: 1fr;
-            }
-            
-            .query-form {
-                flex-direction: column;
-            }
-            
-            .schema-stats {
-                grid-template-columns: 1fr;
-            }
-        }
-        .insight-item {
-            background: #e8f5e8;
-            padding: 10px;
-            margin: 5px 0;
-            border-radius: 5px;
-            border-left: 3px solid #27ae60;
-        }
-        
-        .schema-explanation {
-            background: #f8f9fa;
-            padding: 20px;
-            border-radius: 10px;
-            margin: 20px 0;
-            font-family: 'Courier New', monospace;
-            white-space: pre-wrap;
-            overflow-x: auto;
-        }
-        
-        .schema-table {
-            width: 100%;
-            border-collapse: collapse;
-            margin: 10px 0;
-            background: white;
-            border-radius: 5px;
-            overflow: hidden;
-            box-shadow: 0 2px 4px rgba(0, 0, 0, 0.1);
-        }
-        
-        .schema-table th {
-            background: #34495e;
-            color: white;
-            padding: 12px;
-            text-align: left;
-            font-weight: bold;
-        }
-        
-        .schema-table td {
-            padding: 10px;
-            border-bottom: 1px solid #e9ecef;
-        }
-        
-        .schema-table tr:hover {
-            background: #f8f9fa;
-        }
-        
-        .business-analysis {
-            background: #e3f2fd;
-            padding: 15px;
-            border-radius: 8px;
-            margin: 10px 0;
-            border-left: 4px solid #2196f3;
-        }
-        
-        .query-type-badge {
-            display: inline-block;
-            padding: 4px 8px;
-            border-radius: 12px;
-            font-size: 0.8em;
-            font-weight: bold;
-            text-transform: uppercase;
-        }
-        
-        .query-type-schema {
-            background: #e8f5e8;
-            color: #2e7d32;
-        }
-        
-        .query-type-business {
-            background: #e3f2fd;
-            color: #1565c0;
-        }
-        
-        .query-type-data {
-            background: #fff3e0;
-            color: #ef6c00;
-        }
-        .logo {
-            height: 40px;
-            width: auto;
-            margin-right: 15px;
-            border-radius: 5px;
-        }
-        
-        .small-logo {
-            height: 24px;
-            width: auto;
-            margin-right: 8px;
-            border-radius: 3px;
-            vertical-align: middle;
-        }
-        
-        .logo-section {
-            display: flex;
-            align-items: center;
-        }
-    </style>
+    <link rel="stylesheet" href="{{ url_for('static', filename='app.css') }}">
 </head>
 <body>
     <div class="container">
@@ -788,7 +363,7 @@ HTML_TEMPLATE = """
                     {% if query_results.schema_explanation %}
                     <div class="schema-explanation">
                         <h3>📊 Detailed Schema Analysis</h3>
-                        {{ query_results.schema_explanation | safe }}
+                        {{ query_results.schema_explanation }}
                     </div>
                     {% endif %}
                     {% endif %}
@@ -808,35 +383,22 @@ HTML_TEMPLATE = """
                     </div>
                     <div class="business-analysis" style="margin-top: 15px;">
                         <h3>📈 Detailed Analysis</h3>
-                        {{ query_results.business_analysis | safe }}
+                        {{ query_results.business_analysis }}
                     </div>
                     {% endif %}
                     
                     {% if query_results.data and query_results.query_type not in ['explain_schema', 'business_analysis'] %}
                     <div style="overflow-x: auto;">
-                        <table class="results-table">
-                            <thead>
-                                <tr>
-                                    {% for column in query_results.columns if query_results.columns %}
-                                    <th>{{ column }}</th>
-                                    {% endfor %}
-                                </tr>
-                            </thead>
-                            <tbody>
-                                {% for row in query_results.data[:100] if query_results.data %}
-                                <tr>
-                                    {% for value in row %}
-                                    <td>{{ value }}</td>
-                                    {% endfor %}
-                                </tr>
-                                {% endfor %}
-                            </tbody>
-                        </table>
+                        {{ query_results.html_table }}
                         {% if query_results and query_results.row_count and query_results.row_count > 100 %}
                         <p style="text-align: center; margin-top: 10px; color: #7f8c8d;">
-                            Showing first 100 of {{ query_results.row_count }} results
+                            Showing first <span id="resultsShown">100</span> of {{ query_results.row_count }} results
+                            <button type="button" class="upload-btn" id="loadMoreBtn" onclick="loadMoreResults()">Load more</button>
                         </p>
                         {% endif %}
+                        <p style="text-align: center; margin-top: 10px;">
+                            <a href="{{ url_for('export_results') }}">Download all results as CSV</a>
+                        </p>
                     </div>
                     {% endif %}
                     
@@ -863,6 +425,27 @@ HTML_TEMPLATE = """
             document.getElementById('loading').style.display = 'block';
         }
         
+        function loadMoreResults() {
+            const body = document.querySelector('#resultsTable tbody');
+            fetch('/results_page?offset=' + body.rows.length)
+                .then(response => response.json())
+                .then(data => {
+                    (data.rows || []).forEach(row => {
+                        const tr = body.insertRow();
+                        row.forEach(value => {
+                            tr.insertCell().textContent = value;
+                        });
+                    });
+                    document.getElementById('resultsShown').textContent = body.rows.length;
+                    if (!data.has_more) {
+                        document.getElementById('loadMoreBtn').style.display = 'none';
+                    }
+                })
+                .catch(error => {
+                    console.error('Error:', error);
+                });
+        }
+        
         function handleFileUpload(input) {
             if (input.files && input.files[0]) {
                 const file = input.files[0];
@@ -930,17 +513,162 @@ HTML_TEMPLATE = """
             }
         });
         
-        // Form submission
+        function followQueryJob(jobId) {
+            const status = document.querySelector('#loading p');
+            const source = new EventSource('/progress/' + jobId);
+            source.onmessage = function(e) {
+                const event = JSON.parse(e.data);
+                if (event.stage === 'plan') {
+                    status.textContent = '📋 Query planned, fetching the rows... (' + event.pct + '%)';
+                } else if (event.stage === 'rows') {
+                    status.textContent = '📊 Rows ready, preparing the results... (' + event.pct + '%)';
+                } else if (event.stage === 'done') {
+                    source.close();
+                    location.reload();
+                } else {
+                    source.close();
+                    document.getElementById('loading').style.display = 'none';
+                    alert('Error processing query: ' + event.message);
+                }
+            };
+            source.onerror = function() {
+                source.close();
+                location.reload();
+            };
+        }
+        
+        // Form submission: run the query as a background job and follow its progress
         document.getElementById('queryForm').addEventListener('submit', function(e) {
+            e.preventDefault();
+            const form = this;
             showLoading();
+            fetch('/api/query', {
+                method: 'POST',
+                body: new FormData(form)
+            })
+            .then(response => {
+                if (response.status !== 202) {
+                    // Questions the job API rejects are explained by the regular form post
+                    form.submit();
+                    return;
+                }
+                return response.json().then(data => followQueryJob(data.job_id));
+            })
+            .catch(error => {
+                console.error('Error:', error);
+                form.submit();
+            });
         });
     </script>
 </body>
 </html>
 """
 
-# Global variables to store uploaded data
-uploaded_files = {}
+# Compile the template once at import instead of re-parsing it on every request
+INDEX_TEMPLATE = app.jinja_env.from_string(HTML_TEMPLATE)
+
+def discard_upload(session_id: str, file_data: Dict[str, Any]):
+    """Drop an upload's chat history and delete its file from disk"""
+    chat_histories.pop(session_id, None)
+    try:
+        if os.path.exists(file_data['filepath']):
+            os.remove(file_data['filepath'])
+    except OSError:
+        pass
+
+# Uploaded data per session; the least recently used session is evicted when full
+MAX_UPLOAD_SESSIONS = 32
+uploaded_files = SAPUploadStore(MAX_UPLOAD_SESSIONS, on_evict=discard_upload)
+
+# Chat history lives server-side keyed by session id; the cookie only carries the id.
+# Only the last 6 question/answer exchanges are kept, for the most recently active sessions;
+# idle histories expire with the session TTL.
+CHAT_HISTORY_MAX_MESSAGES = 12
+MAX_CHAT_SESSIONS = 1024
+chat_histories = SAPUploadStore(MAX_CHAT_SESSIONS)
+
+# Rows written per chunk when streaming a CSV export
+EXPORT_BATCH_ROWS = 10000
+
+# Uploads expire after an hour without activity; expiry is checked every few minutes
+SESSION_TTL = 3600
+CLEANUP_INTERVAL = 300
+last_cleanup_time = 0.0
+
+# Rows rendered per results page; the rest are fetched from /results_page
+RESULTS_PAGE_SIZE = 100
+
+# Suggestions shown before a file is uploaded (per-file suggestions are computed at upload)
+DEFAULT_QUERY_SUGGESTIONS = ENTERPRISE_EXAMPLE_QUERIES[:6]
+
+# In-memory LRU cache for AI insights, keyed by question + schema fingerprint + result summary
+AI_CACHE_SIZE = 512
+ai_response_cache = OrderedDict()
+ai_cache_lock = threading.Lock()
+
+# Background query jobs; each job's progress events are read by the /progress SSE stream
+QUERY_JOB_WORKERS = 4
+QUERY_JOB_TIMEOUT = 120  # seconds a progress stream waits for the next event
+query_job_executor = ThreadPoolExecutor(max_workers=QUERY_JOB_WORKERS, thread_name_prefix='query-jobs')
+query_jobs = {}
+
+# Query plans kept per upload, keyed by question text
+PLAN_CACHE_SIZE = 128
+
+# Worker pool for outbound OpenAI calls so they never block the request thread
+AI_WORKERS = 4
+AI_REQUEST_TIMEOUT = 30  # seconds; keeps a slow OpenAI call from pinning a worker thread
+ai_executor = ThreadPoolExecutor(max_workers=AI_WORKERS, thread_name_prefix='ai-insights')
+
+# One shared OpenAI client so every call reuses its keep-alive connection pool
+ai_client = openai.OpenAI(
+    api_key=config.openai_api_key,
+    timeout=AI_REQUEST_TIMEOUT,
+    max_retries=1
+) if config.openai_api_key else None
+
+def schema_fingerprint(schema_analysis: Dict[str, Any]) -> str:
+    """Stable hash of a schema analysis, computed once per upload"""
+    payload = orjson.dumps(schema_analysis, default=str, option=ORJSONProvider.OPTIONS)
+    return hashlib.sha1(payload).hexdigest()
+
+def get_chat_history() -> deque:
+    """Return the bounded chat history for the current session; a new one is not stored until saved"""
+    entry = chat_histories.get(session.get('session_id'))
+    if entry is None:
+        return deque(maxlen=CHAT_HISTORY_MAX_MESSAGES)
+    entry['last_access'] = time.time()
+    return entry['messages']
+
+def save_chat_history(chat_history: deque):
+    """Store the chat history for the current session, creating the session id if needed"""
+    if 'session_id' not in session:
+        session['session_id'] = str(uuid.uuid4())
+    chat_histories[session['session_id']] = {'messages': chat_history, 'last_access': time.time()}
+
+def ai_cache_key(question: str, schema_fp: str, execution_result: Dict[str, Any]) -> str:
+    """Cache key for an AI request: normalized question + schema fingerprint + result summary"""
+    normalized = ' '.join(question.lower().split())
+    summary = orjson.dumps(
+        [execution_result.get('row_count'), execution_result.get('summary_stats')],
+        default=str, option=ORJSONProvider.OPTIONS
+    ).decode()
+    return hashlib.sha1(f"{normalized}|{schema_fp}|{summary}".encode('utf-8')).hexdigest()
+
+def plan_query_cached(question: str, file_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Plan a question against an upload, reusing the plan for repeated questions"""
+    plan_cache = file_data.setdefault('plan_cache', OrderedDict())
+    if question in plan_cache:
+        plan_cache.move_to_end(question)
+        return plan_cache[question]
+    
+    plan_result = SAPQueryPlanner(file_data['schema_analysis']).plan_query(question)
+    # Errors are not cached so a transient failure can be retried
+    if plan_result['status'] != 'error':
+        plan_cache[question] = plan_result
+        if len(plan_cache) > PLAN_CACHE_SIZE:
+            plan_cache.popitem(last=False)
+    return plan_result
 
 @app.route("/", methods=["GET", "POST"])
 def index():
@@ -952,16 +680,22 @@ def index():
     uploaded_file = None
     schema_analysis = None
     query_suggestions = []
-    chat_history = session.get('chat_history', [])
+    chat_history = get_chat_history()
     
     # Get session data
     session_id = session.get('session_id')
     if session_id and session_id in uploaded_files:
         uploaded_file = uploaded_files[session_id]
+        uploaded_file['last_access'] = time.time()
         schema_analysis = uploaded_file.get('schema_analysis')
-        query_suggestions = get_query_suggestions(schema_analysis) if schema_analysis else ENTERPRISE_EXAMPLE_QUERIES[:6]
-    if not query_suggestions or len(query_suggestions) == 0:
-        query_suggestions = ENTERPRISE_EXAMPLE_QUERIES[:6]
+        query_suggestions = uploaded_file.get('query_suggestions')
+        # Results of a background query job are shown once, on the reload that follows it
+        job_response = uploaded_file.pop('job_response', None)
+        if job_response and request.method == "GET":
+            question = job_response['question']
+            query_results = job_response['query_results']
+    if not query_suggestions:
+        query_suggestions = DEFAULT_QUERY_SUGGESTIONS
 
     # Fetch stats for sidebar
     stats = logger.get_demo_stats() if hasattr(logger, 'get_demo_stats') else None
@@ -973,8 +707,8 @@ def index():
             # If upload was successful, set a success message and reload
             if resp.is_json and resp.json.get('success'):
                 success_message = 'File uploaded successfully! You can now ask questions about your SAP data.'
-                return render_template_string(
-                    HTML_TEMPLATE,
+                return stream_template(
+                    INDEX_TEMPLATE,
                     error_message=error_message,
                     success_message=success_message,
                     question=question,
@@ -983,7 +717,7 @@ def index():
                     schema_analysis=schema_analysis,
                     query_suggestions=query_suggestions,
                     stats=stats,
-                    chat_history=chat_history
+                    chat_history=list(chat_history)
                 )
             return resp
         else:
@@ -994,9 +728,9 @@ def index():
                 error_message = "Sorry, I couldn't understand your question. Please ask a specific question about your SAP data (e.g., 'Show vendor payments for Q1', 'Analyze overdue invoices', etc.)."
                 chat_history.append({"role": "user", "content": question})
                 chat_history.append({"role": "assistant", "content": error_message})
-                session['chat_history'] = chat_history
-                return render_template_string(
-                    HTML_TEMPLATE,
+                save_chat_history(chat_history)
+                return stream_template(
+                    INDEX_TEMPLATE,
                     error_message=error_message,
                     success_message=success_message,
                     question=question,
@@ -1005,22 +739,17 @@ def index():
                     schema_analysis=schema_analysis,
                     query_suggestions=query_suggestions,
                     stats=stats,
-                    chat_history=chat_history
+                    chat_history=list(chat_history)
                 )
             if question and session_id and session_id in uploaded_files:
                 query_results = process_query(question, uploaded_files[session_id], chat_history)
-                # Add to chat history
-                chat_history.append({"role": "user", "content": question})
-                if query_results and 'natural_language_response' in query_results:
-                    chat_history.append({"role": "assistant", "content": query_results['natural_language_response']})
-                elif query_results and 'message' in query_results:
-                    chat_history.append({"role": "assistant", "content": query_results['message']})
-                session['chat_history'] = chat_history
+                record_chat_turn(chat_history, question, query_results)
+                save_chat_history(chat_history)
             else:
                 error_message = "Please upload a file first before asking questions."
     
-    return render_template_string(
-        HTML_TEMPLATE,
+    return stream_template(
+        INDEX_TEMPLATE,
         error_message=error_message,
         success_message=success_message,
         question=question,
@@ -1029,7 +758,7 @@ def index():
         schema_analysis=schema_analysis,
         query_suggestions=query_suggestions,
         stats=stats,
-        chat_history=chat_history
+        chat_history=list(chat_history)
     )
 
 @app.route("/upload", methods=["POST"])
@@ -1053,13 +782,16 @@ def handle_file_upload():
             # Save file
             filename = secure_filename(file.filename)
             filepath = os.path.join(app.config['UPLOAD_FOLDER'], f"{session_id}_{filename}")
-            file.save(filepath)
+            # Copy the upload to disk in 1 MiB chunks, hashing it in the same pass
+            content_hash = save_upload(file, filepath)
             
-            # Load data into memory first (for small files)
-            df = pd.read_csv(filepath)
+            # Load data into memory first; the C parser reads straight from the mapped file
+            df = pd.read_csv(filepath, engine='c', memory_map=True)
             
-            # Analyze schema
-            schema_analysis = schema_analyzer.analyze_csv_file(filepath)
+            # Analyze schema; identical file contents reuse the cached analysis
+            schema_analysis = schema_analyzer.analyze_dataframe(
+                df, round(os.path.getsize(filepath) / 1024 / 1024, 2), content_hash=content_hash
+            )
             
             # Log detected columns for debugging
             logger.app_logger.info(f"[DEBUG] Detected columns in column_analysis: {list(schema_analysis.get('column_analysis', {}).keys())}")
@@ -1082,12 +814,28 @@ def handle_file_upload():
             schema_analysis['schema_summary'] = schema_summary
             schema_analysis['sap_table_type'] = report_identification['table_type']
             
+            # Convert date/numeric columns once; the executor is kept so every query
+            # reuses the typed frame and its cached filter masks
+            query_executor = SAPQueryExecutor(df, schema_analysis)
+            df = query_executor.df
+            
+            # Fingerprint the schema once so AI responses can be cached per upload
+            schema_fp = schema_fingerprint(schema_analysis)
+            
             # Store file info
             uploaded_files[session_id] = {
+                'created_time': time.time(),
+                'last_access': time.time(),
                 'filepath': filepath,
                 'filename': filename,
                 'df': df,
+                'query_executor': query_executor,
                 'schema_analysis': schema_analysis,
+                'content_hash': content_hash,
+                'schema_fingerprint': schema_fp,
+                # Static system/schema messages, built once and reused for every question
+                'prompt_prefix': tuple(create_enterprise_prompt_prefix(schema_analysis)),
+                'query_suggestions': get_query_suggestions(schema_analysis),
                 'name': filename,
                 'size_mb': schema_analysis['file_info']['file_size_mb'],
                 'rows': schema_analysis['file_info']['total_rows'],
@@ -1102,7 +850,7 @@ def handle_file_upload():
             )
             
             # Clear chat history on new upload
-            session['chat_history'] = []
+            chat_histories.pop(session_id)
             
             return jsonify({'success': True, 'message': 'File uploaded successfully'})
         else:
@@ -1112,16 +860,23 @@ def handle_file_upload():
         logger.log_error('file_upload_error', str(e))
         return jsonify({'success': False, 'message': f'Error uploading file: {str(e)}'})
 
-def process_query(question: str, file_data: Dict[str, Any], chat_history=None) -> Dict[str, Any]:
-    """Process a natural language query"""
+def record_chat_turn(chat_history: deque, question: str, query_results: Dict[str, Any]):
+    """Add a question and the assistant's reply to the chat history"""
+    chat_history.append({"role": "user", "content": question})
+    if query_results and 'natural_language_response' in query_results:
+        chat_history.append({"role": "assistant", "content": query_results['natural_language_response']})
+    elif query_results and 'message' in query_results:
+        chat_history.append({"role": "assistant", "content": query_results['message']})
+
+def process_query(question: str, file_data: Dict[str, Any], chat_history=None, progress=None) -> Dict[str, Any]:
+    """Process a natural language query; progress(stage, pct) is called as each stage finishes"""
     try:
         start_time = time.time()
         
-        # Create query planner
-        query_planner = SAPQueryPlanner(file_data['schema_analysis'])
-        
-        # Plan the query
-        plan_result = query_planner.plan_query(question)
+        # Plan the query (cached per upload for repeated questions)
+        plan_result = plan_query_cached(question, file_data)
+        if progress:
+            progress('plan', 30)
         
         if plan_result['status'] == 'ambiguous':
             return {
@@ -1148,10 +903,13 @@ def process_query(question: str, file_data: Dict[str, Any], chat_history=None) -
                 'insights': []
             }
         
-        # Execute the query
-        query_executor = SAPQueryExecutor(file_data['df'], file_data['schema_analysis'])
+        # Execute the query on the upload's executor
+        query_executor = file_data.get('query_executor') or SAPQueryExecutor(file_data['df'], file_data['schema_analysis'])
         execution_result = query_executor.execute_query(plan_result['query_plan'])
         
+        if progress:
+            progress('rows', 70)
+        
         if execution_result['status'] == 'error':
             return {
                 'status': 'error',
@@ -1164,48 +922,40 @@ def process_query(question: str, file_data: Dict[str, Any], chat_history=None) -
                 'insights': []
             }
         
-        # Get AI insights
-        ai_response = get_ai_insights(question, file_data['schema_analysis'], execution_result)
-        
-        processing_time = time.time() - start_time
-        
-        # Log the interaction
-        logger.log_user_interaction(
-            user_question=question,
-            ai_response=ai_response,
-            processing_time=processing_time,
-            data_context=file_data['schema_analysis']
+        # AI insights are only logged, not rendered, so fetch them in the background
+        # and return the query results without waiting on the OpenAI round-trip
+        ai_executor.submit(
+            record_ai_insights,
+            question,
+            file_data['schema_analysis'],
+            file_data.get('schema_fingerprint'),
+            execution_result,
+            start_time,
+            file_data.get('prompt_prefix')
         )
         
+        # Keep the full result server-side so further pages can be fetched on demand
+        file_data['last_result'] = {
+            'columns': execution_result['columns'],
+            'data': execution_result['data']
+        }
+        
+        # Only the first page goes to the template; later pages and exports read last_result
+        preview = execution_result['data'][:RESULTS_PAGE_SIZE]
         return {
             'status': 'success',
-            'data': execution_result['data'],
+            'data': preview,
             'columns': execution_result['columns'],
+            'html_table': results_table_html(execution_result['columns'], preview),
             'row_count': execution_result['row_count'],
             'execution_time': execution_result['execution_time'],
             'query_type': plan_result['query_plan'].get('action', 'show'),
             'insights': execution_result['insights'],
-            'ai_response': ai_response,
             'natural_language_response': execution_result.get('natural_language_response', '')
         }
     
     except Exception as e:
-        # Handle OpenAI quota errors gracefully
-        if "insufficient_quota" in str(e) or "quota" in str(e).lower():
-            logger.log_error('openai_quota_error', f"OpenAI quota exceeded: {str(e)}", {'question': question})
-            return {
-                'status': 'success',
-                'data': execution_result.get('data', []),
-                'columns': execution_result.get('columns', []),
-                'row_count': execution_result.get('row_count', 0),
-                'execution_time': execution_result.get('execution_time', 0),
-                'query_type': plan_result['query_plan'].get('action', 'show'),
-                'insights': execution_result.get('insights', []),
-                'ai_response': "AI insights temporarily unavailable due to API quota limits. Please try again later or contact your administrator.",
-                'natural_language_response': execution_result.get('natural_language_response', '')
-            }
-        
-        # Handle other errors with safe serialization
+        # Handle errors with safe serialization (AI quota errors are handled in get_ai_insights)
         error_context = {'question': question}
         try:
             # Safely serialize context for logging
@@ -1225,11 +975,36 @@ def process_query(question: str, file_data: Dict[str, Any], chat_history=None) -
             'insights': []
         }
 
-def get_ai_insights(question: str, schema_analysis: Dict[str, Any], execution_result: Dict[str, Any]) -> str:
-    """Get AI insights about the query results"""
+def record_ai_insights(question: str, schema_analysis: Dict[str, Any], schema_fp: str,
+                       execution_result: Dict[str, Any], start_time: float, prompt_prefix=None) -> None:
+    """Fetch AI insights and log the interaction (runs on the AI worker pool)"""
+    try:
+        ai_response = get_ai_insights(question, schema_analysis, execution_result, schema_fp=schema_fp,
+                                      prompt_prefix=prompt_prefix)
+        
+        logger.log_user_interaction(
+            user_question=question,
+            ai_response=ai_response,
+            processing_time=time.time() - start_time,
+            data_context=schema_analysis
+        )
+    except Exception as e:
+        logger.log_error('ai_insights_error', str(e), {'question': question})
+
+def get_ai_insights(question: str, schema_analysis: Dict[str, Any], execution_result: Dict[str, Any],
+                    schema_fp: str = None, bypass_cache: bool = False, prompt_prefix=None) -> str:
+    """Get AI insights about the query results (cached per question and schema)"""
     try:
+        # Serve repeated questions against the same upload from the cache
+        cache_key = ai_cache_key(question, schema_fp or schema_fingerprint(schema_analysis), execution_result)
+        if not bypass_cache:
+            with ai_cache_lock:
+                if cache_key in ai_response_cache:
+                    ai_response_cache.move_to_end(cache_key)
+                    return ai_response_cache[cache_key]
+        
         # Create context-aware prompt
-        messages = create_enterprise_query_prompt(question, schema_analysis)
+        messages = create_enterprise_query_prompt(question, schema_analysis, prompt_prefix=prompt_prefix)
         
         # Add execution results context
         execution_context = f"""
@@ -1242,8 +1017,11 @@ Please provide business insights and recommendations based on these results.
 """
         messages.append({"role": "system", "content": execution_context})
         
-        # Call OpenAI (new API syntax)
-        reply = openai.chat.completions.create(
+        if ai_client is None:
+            raise RuntimeError("OPENAI_API_KEY is not set")
+        
+        # Call OpenAI through the shared client
+        reply = ai_client.chat.completions.create(
             model="gpt-4",
             messages=messages,
             max_tokens=500,
@@ -1254,6 +1032,13 @@ Please provide business insights and recommendations based on these results.
         # Log the AI request
         logger.log_ai_request(messages, response)
         
+        # Cache the response, evicting the least recently used entry when full
+        with ai_cache_lock:
+            ai_response_cache[cache_key] = response
+            ai_response_cache.move_to_end(cache_key)
+            if len(ai_response_cache) > AI_CACHE_SIZE:
+                ai_response_cache.popitem(last=False)
+        
         return response
     
     except Exception as e:
@@ -1286,31 +1071,200 @@ def get_schema(session_id):
     else:
         return jsonify({'error': 'Session not found'}), 404
 
+def result_row_values(row, columns) -> list:
+    """Cell values of a result row in column order; schema and business results store dict rows"""
+    if isinstance(row, dict):
+        return [row.get(column) for column in columns]
+    return row
+
+def results_table_html(columns, data) -> Markup:
+    """Render the first page of a result as an HTML table, assembling cells with str.join"""
+    header = ''.join(f'<th>{escape(column)}</th>' for column in columns)
+    rows = ''.join(
+        '<tr>' + ''.join(f'<td>{escape(str(value))}</td>' for value in result_row_values(row, columns)) + '</tr>'
+        for row in data[:RESULTS_PAGE_SIZE]
+    )
+    return Markup(
+        f'<table class="results-table" id="resultsTable"><thead><tr>{header}</tr></thead>'
+        f'<tbody>{rows}</tbody></table>'
+    )
+
+def results_page(last_result: Dict[str, Any], offset: int) -> Dict[str, Any]:
+    """One page of a stored query result, with cells formatted the way the template renders them"""
+    columns = last_result['columns']
+    page = last_result['data'][offset:offset + RESULTS_PAGE_SIZE]
+    return {
+        'columns': columns,
+        'rows': [[str(value) for value in result_row_values(row, columns)] for row in page],
+        'offset': offset,
+        'row_count': len(last_result['data']),
+        'has_more': offset + len(page) < len(last_result['data'])
+    }
+
+@app.route("/results_page")
+def get_results_page():
+    """API endpoint to get the next page of the last query result"""
+    session_id = session.get('session_id')
+    if not session_id or session_id not in uploaded_files or 'last_result' not in uploaded_files[session_id]:
+        return jsonify({'error': 'No query results found'}), 404
+    
+    offset = max(request.args.get('offset', 0, type=int), 0)
+    return jsonify(results_page(uploaded_files[session_id]['last_result'], offset))
+
+@app.route("/export/results.csv")
+def export_results():
+    """Stream the last query result as CSV, a batch of rows at a time"""
+    session_id = session.get('session_id')
+    if not session_id or session_id not in uploaded_files or 'last_result' not in uploaded_files[session_id]:
+        return jsonify({'error': 'No query results found'}), 404
+    last_result = uploaded_files[session_id]['last_result']
+    
+    def generate():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        columns = last_result['columns']
+        writer.writerow(columns)
+        data = last_result['data']
+        for start in range(0, len(data), EXPORT_BATCH_ROWS):
+            writer.writerows(result_row_values(row, columns) for row in data[start:start + EXPORT_BATCH_ROWS])
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        yield buffer.getvalue()
+    
+    return Response(generate(), mimetype='text/csv',
+                    headers={'Content-Disposition': 'attachment; filename=results.csv'})
+
+@app.route("/api/state")
+def get_state():
+    """API endpoint to get the page state for the current session, for client-side rendering"""
+    session_id = session.get('session_id')
+    file_data = uploaded_files.get(session_id) if session_id else None
+    
+    state = {
+        'uploaded_file': None,
+        'schema_analysis': None,
+        'query_suggestions': DEFAULT_QUERY_SUGGESTIONS,
+        'chat_history': list(get_chat_history()),
+        'results': None
+    }
+    if file_data:
+        state['uploaded_file'] = {
+            'name': file_data['name'],
+            'size_mb': file_data['size_mb'],
+            'rows': file_data['rows'],
+            'columns': file_data['columns']
+        }
+        state['schema_analysis'] = file_data['schema_analysis']
+        state['query_suggestions'] = file_data.get('query_suggestions') or DEFAULT_QUERY_SUGGESTIONS
+        if 'last_result' in file_data:
+            state['results'] = results_page(file_data['last_result'], 0)
+    
+    return jsonify(state)
+
+def run_query_job(job_id: str, question: str, file_data: Dict[str, Any], chat_history: deque):
+    """Run a query in the background, publishing progress events for the job"""
+    events = query_jobs[job_id]['events']
+    try:
+        query_results = process_query(
+            question, file_data, progress=lambda stage, pct: events.put({'stage': stage, 'pct': pct})
+        )
+        record_chat_turn(chat_history, question, query_results)
+        # The page reloads when the job is done and renders these results once
+        file_data['job_response'] = {'question': question, 'query_results': query_results}
+        
+        events.put({
+            'stage': 'done',
+            'pct': 100,
+            'status': query_results['status'],
+            'message': query_results.get('message'),
+            'query_type': query_results.get('query_type'),
+            'row_count': query_results.get('row_count'),
+            'execution_time': query_results.get('execution_time'),
+            'natural_language_response': query_results.get('natural_language_response'),
+            'results': results_page(file_data['last_result'], 0) if query_results['status'] == 'success' else None
+        })
+    except Exception as e:
+        logger.log_error('query_job_error', str(e), {'question': question})
+        events.put({'stage': 'error', 'message': str(e)})
+
+@app.route("/api/query", methods=["POST"])
+def submit_query():
+    """API endpoint to start a query in the background; progress is streamed from /progress/<job_id>"""
+    question = request.form.get('question', '').strip()
+    session_id = session.get('session_id')
+    if not session_id or session_id not in uploaded_files:
+        return jsonify({'error': 'Please upload a file first before asking questions.'}), 400
+    if len(question) < 3:
+        return jsonify({'error': 'Please ask a specific question about your SAP data.'}), 400
+    
+    # Store the history now; the job adds this turn to it when it finishes
+    chat_history = get_chat_history()
+    save_chat_history(chat_history)
+    
+    job_id = uuid.uuid4().hex
+    query_jobs[job_id] = {'events': queue.Queue(), 'created_time': time.time()}
+    query_job_executor.submit(run_query_job, job_id, question, uploaded_files[session_id], chat_history)
+    return jsonify({'job_id': job_id}), 202
+
+@app.route("/progress/<job_id>")
+def query_progress(job_id):
+    """Server-sent events for a background query: plan, rows, then done (or error)"""
+    if job_id not in query_jobs:
+        return jsonify({'error': 'Job not found'}), 404
+    events = query_jobs[job_id]['events']
+    
+    def stream():
+        while True:
+            try:
+                event = events.get(timeout=QUERY_JOB_TIMEOUT)
+            except queue.Empty:
+                event = {'stage': 'error', 'message': 'Timed out waiting for the query'}
+            yield f"data: {app.json.dumps(event)}\n\n"
+            if event['stage'] in ('done', 'error'):
+                query_jobs.pop(job_id, None)
+                break
+    
+    return Response(stream(), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache'})
+
 # Cleanup old sessions periodically
 def cleanup_old_sessions():
     """Clean up old session data"""
+    global last_cleanup_time
     current_time = time.time()
+    last_cleanup_time = current_time
     expired_sessions = []
     
     for session_id, file_data in uploaded_files.items():
-        # Remove sessions older than 1 hour
-        if current_time - file_data.get('created_time', 0) > 3600:
+        # Remove sessions idle for longer than the TTL
+        if current_time - file_data.get('last_access', file_data.get('created_time', 0)) > SESSION_TTL:
             expired_sessions.append(session_id)
     
     for session_id in expired_sessions:
-        try:
-            # Remove file
-            if os.path.exists(uploaded_files[session_id]['filepath']):
-                os.remove(uploaded_files[session_id]['filepath'])
-            # Remove from memory
-            del uploaded_files[session_id]
-        except:
-            pass
+        file_data = uploaded_files.pop(session_id)
+        if file_data:
+            discard_upload(session_id, file_data)
+    
+    # Drop jobs whose progress stream was never read
+    for job_id, job in list(query_jobs.items()):
+        if current_time - job['created_time'] > SESSION_TTL:
+            query_jobs.pop(job_id, None)
+    
+    # Chat histories of sessions that never uploaded a file expire the same way
+    for session_id, entry in chat_histories.items():
+        if current_time - entry['last_access'] > SESSION_TTL:
+            chat_histories.pop(session_id)
+
+@app.before_request
+def expire_old_sessions():
+    """Run session cleanup at most once per CLEANUP_INTERVAL"""
+    if time.time() - last_cleanup_time > CLEANUP_INTERVAL:
+        cleanup_old_sessions()
 
 # When the file is run directly (not imported), start the Flask development server
 if __name__ == "__main__":
     # Clean up old sessions on startup
     cleanup_old_sessions()
     
-    # Run the app on all interfaces (important for Docker) at port 5000
-    app.run(host="0.0.0.0", port=5000, debug=True)
+    # Development server only; production runs under gunicorn (see gunicorn.conf.py)
+    app.run(host="0.0.0.0", port=5000, debug=os.getenv("FLASK_DEBUG") == "1")
@@ -0,0 +1,20 @@
+"""
+SAP AI Demo - Configuration
+Reads environment settings once at import time
+"""
+
+import os
+from dataclasses import dataclass
+
+from dotenv import load_dotenv
+
+# Load environment variables from .env file into the system
+load_dotenv()
+
+@dataclass(frozen=True)
+class Config:
+    openai_api_key: str = os.getenv("OPENAI_API_KEY", "")
+    secret_key: str = os.getenv("SECRET_KEY", "your-secret-key-here")
+    upload_folder: str = os.getenv("UPLOAD_FOLDER", "uploads")
+
+config = Config()
@@ -8,6 +8,9 @@ import os
 from datetime import datetime, timedelta
 import logging
 
+# Low-cardinality SAP code columns in BKPF/BSEG
+CATEGORICAL_COLUMNS = ['BUKRS', 'WAERS', 'BLART', 'KOART', 'SHKZG', 'LIFNR', 'KUNNR']
+
 class SAPDataManager:
     def __init__(self, data_dir="mock_data"):
         self.data_dir = data_dir
@@ -16,10 +19,12 @@ class SAPDataManager:
         self.lfa1_df = None
         self.kna1_df = None
         self.skat_df = None
+        self._account_totals = None  # Per-account debit/credit totals, built on first balance query
         self.logger = logging.getLogger(__name__)
         
     def load_mock_data(self):
         """Load mock SAP data from CSV files or create sample data if files don't exist"""
+        self._account_totals = None
         try:
             # Try to load existing CSV files
             if os.path.exists(os.path.join(self.data_dir, "BKPF.csv")):
@@ -37,6 +42,15 @@ class SAPDataManager:
         except Exception as e:
             self.logger.error(f"Error loading data: {e}")
             self._create_sample_data()
+        
+        # Parse posting dates once so date filters and min/max run on datetime64
+        self.bkpf_df['BUDAT'] = pd.to_datetime(self.bkpf_df['BUDAT'], format='%Y-%m-%d', cache=True, errors='coerce')
+        
+        # Store repeated code columns as categoricals so equality filters compare small integer codes
+        for df in (self.bkpf_df, self.bseg_df):
+            for column in CATEGORICAL_COLUMNS:
+                if column in df.columns:
+                    df[column] = df[column].astype('category')
     
     def _create_sample_data(self):
         """Create sample SAP data for demonstration"""
@@ -114,12 +128,19 @@ class SAPDataManager:
             'lfa1_count': len(self.lfa1_df),
             'kna1_count': len(self.kna1_df),
             'skat_count': len(self.skat_df),
-            'date_range': f"{self.bkpf_df['BUDAT'].min()} to {self.bkpf_df['BUDAT'].max()}",
+            'date_range': self.get_date_range(),
             'company_codes': list(self.bkpf_df['BUKRS'].unique()),
             'document_types': list(self.bkpf_df['BLART'].unique()),
             'currencies': list(self.bkpf_df['WAERS'].unique())
         }
     
+    def get_date_range(self):
+        """Posting date range of the BKPF documents, or 'n/a' when there are no valid dates"""
+        start, end = self.bkpf_df['BUDAT'].min(), self.bkpf_df['BUDAT'].max()
+        if pd.isna(start):
+            return 'n/a'
+        return f"{start:%Y-%m-%d} to {end:%Y-%m-%d}"
+    
     def query_overdue_invoices(self):
         """Example query: Find overdue invoices"""
         # This would typically involve business logic to determine overdue status
@@ -129,22 +150,33 @@ class SAPDataManager:
     
     def query_vendor_payments(self, quarter=None):
         """Example query: Get vendor payments"""
-        vendor_payments = self.bkpf_df[self.bkpf_df['BLART'] == 'S2']
+        mask = self.bkpf_df['BLART'] == 'S2'
         if quarter:
-            # Add quarter filtering logic here
-            pass
-        return vendor_payments.to_dict('records')
+            # Quarters arrive as 'Q1'..'Q4'
+            mask &= self.bkpf_df['BUDAT'].dt.quarter.eq(int(quarter[-1]))
+        return self.bkpf_df[mask].to_dict('records')
     
     def query_account_balance(self, account_number):
         """Example query: Get account balance"""
-        account_transactions = self.bseg_df[self.bseg_df['KONTO'] == account_number]
-        debits = account_transactions[account_transactions['SHKZG'] == 'S']['DMBTR'].sum()
-        credits = account_transactions[account_transactions['SHKZG'] == 'H']['DMBTR'].sum()
+        debits, credits, transaction_count = self._get_account_totals().get(account_number, (0.0, 0.0, 0))
         balance = debits - credits
         return {
             'account': account_number,
             'debits': debits,
             'credits': credits,
             'balance': balance,
-            'transaction_count': len(account_transactions)
-        } 
\ No newline at end of file
+            'transaction_count': transaction_count
+        }
+    
+    def _get_account_totals(self):
+        """Debit/credit totals and line counts for every account, from one groupby pass over BSEG"""
+        if self._account_totals is None:
+            amounts = self.bseg_df.groupby(['KONTO', 'SHKZG'], sort=False)['DMBTR'].sum().unstack(fill_value=0.0)
+            counts = self.bseg_df.groupby('KONTO', sort=False).size()
+            debits = amounts['S'] if 'S' in amounts.columns else pd.Series(0.0, index=amounts.index)
+            credits = amounts['H'] if 'H' in amounts.columns else pd.Series(0.0, index=amounts.index)
+            self._account_totals = {
+                account: (debits.get(account, 0.0), credits.get(account, 0.0), int(count))
+                for account, count in counts.items()
+            }
+        return self._account_totals 
\ No newline at end of file
@@ -0,0 +1,34 @@
+"""
+SAP AI Demo - Debug Fixtures
+Shared test DataFrame and schema analysis for the debug scripts
+"""
+
+import pandas as pd
+
+# Create a simple test DataFrame
+TEST_DF = pd.DataFrame({
+    'BUDAT': ['2024-01-01', '2024-01-02', '2024-01-03'],
+    'LIFNR': ['V001', 'V002', 'V001'],
+    'WRBTR': [100.0, 200.0, 150.0],
+    'BLART': ['KR', 'KG', 'KR']
+})
+
+# Create schema analysis
+TEST_SCHEMA = {
+    'sap_table_type': 'BSEG',
+    'file_info': {
+        'total_rows': 3,
+        'total_columns': 4
+    },
+    'schema_summary': 'This is a BSEG table with accounting line items.',
+    'column_analysis': {
+        'BUDAT': {'data_category': 'date', 'sap_patterns': ['posting_date']},
+        'LIFNR': {'data_category': 'categorical', 'sap_patterns': ['vendor_number']},
+        'WRBTR': {'data_category': 'numeric', 'sap_patterns': ['local_amount']},
+        'BLART': {'data_category': 'categorical', 'sap_patterns': ['document_type']}
+    }
+}
+
+def get_test_df():
+    """Shallow copy of TEST_DF for callers that modify the frame; the column data is shared"""
+    return TEST_DF.copy(deep=False)
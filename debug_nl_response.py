@@ -3,33 +3,11 @@
 Debug script to test natural language response generation
 """
 
-import pandas as pd
+from debug_fixtures import TEST_SCHEMA, get_test_df
 from query_executor import SAPQueryExecutor
 
-# Create a simple test DataFrame
-test_data = {
-    'BUDAT': ['2024-01-01', '2024-01-02', '2024-01-03'],
-    'LIFNR': ['V001', 'V002', 'V001'],
-    'WRBTR': [100.0, 200.0, 150.0],
-    'BLART': ['KR', 'KG', 'KR']
-}
-df = pd.DataFrame(test_data)
-
-# Create schema analysis
-schema_analysis = {
-    'sap_table_type': 'BSEG',
-    'file_info': {
-        'total_rows': 3,
-        'total_columns': 4
-    },
-    'schema_summary': 'This is a BSEG table with accounting line items.',
-    'column_analysis': {
-        'BUDAT': {'data_category': 'date', 'sap_patterns': ['posting_date']},
-        'LIFNR': {'data_category': 'categorical', 'sap_patterns': ['vendor_number']},
-        'WRBTR': {'data_category': 'numeric', 'sap_patterns': ['local_amount']},
-        'BLART': {'data_category': 'categorical', 'sap_patterns': ['document_type']}
-    }
-}
+df = get_test_df()
+schema_analysis = TEST_SCHEMA
 
 # Create executor
 executor = SAPQueryExecutor(df, schema_analysis)
@@ -0,0 +1,24 @@
+"""
+SAP AI Demo - Gunicorn Configuration
+Usage: gunicorn -c gunicorn.conf.py app:app
+"""
+
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+
+# Import the app (env, template, mock data) once in the master and fork workers from it
+preload_app = True
+
+# Uploaded files and chat history are kept in process memory, so default to one worker
+workers = int(os.getenv("GUNICORN_WORKERS", "1"))
+
+# Threaded workers so requests waiting on uploads or OpenAI calls don't block each other
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", "8"))
+
+# Uploads and analysis can take a while on large files
+timeout = 120
+
+# Hold idle client connections briefly so browsers can reuse them
+keepalive = 5
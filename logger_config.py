@@ -3,69 +3,163 @@ SAP AI Demo - Logging Configuration
 Handles logging and debugging for demo traceability
 """
 
+import atexit
 import logging
+import logging.handlers
 import os
+import threading
+import time
 from datetime import datetime
-import json
-import numpy as np
-import pandas as pd
+import orjson
 
-class SAPDemoLogger:
-    def __init__(self, log_dir="logs"):
-        self.log_dir = log_dir
-        os.makedirs(log_dir, exist_ok=True)
-        self.setup_logging()
-    
-    def safe_json_serialize(self, obj):
-        """Safely serialize objects for JSON, handling numpy types and other non-serializable objects"""
-        if isinstance(obj, (np.integer, np.int64, np.int32)):
+# orjson handles dicts, lists and numpy natively; only leaf types it can't encode reach _json_default
+JSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+# Root handlers are installed once per process, however many loggers are created
+_LOGGING_CONFIGURED = False
+
+# Log files rotate instead of growing without bound
+LOG_MAX_BYTES = 10 * 1024 * 1024
+LOG_BACKUP_COUNT = 5
+
+# Read size used when counting lines appended to a log file
+STATS_READ_CHUNK = 1 << 20
+
+# Block size for reading a log backwards from its end
+TAIL_READ_BLOCK = 64 * 1024
+
+def _json_default(obj):
+    """Convert values orjson can't serialize (pandas objects, numpy scalars, anything else)"""
+    # numpy/pandas are only imported once such a value shows up, keeping this module light to import
+    module = type(obj).__module__
+    if module.startswith('numpy'):
+        import numpy as np
+        if isinstance(obj, np.integer):
             return int(obj)
-        elif isinstance(obj, (np.floating, np.float64, np.float32)):
+        elif isinstance(obj, np.floating):
             return float(obj)
         elif isinstance(obj, np.ndarray):
             return obj.tolist()
-        elif isinstance(obj, pd.Series):
+    elif module.startswith('pandas'):
+        import pandas as pd
+        if isinstance(obj, pd.Series):
             return obj.tolist()
         elif isinstance(obj, pd.DataFrame):
-            return obj.to_dict('records')
-        elif isinstance(obj, dict):
-            return {key: self.safe_json_serialize(value) for key, value in obj.items()}
-        elif isinstance(obj, list):
-            return [self.safe_json_serialize(item) for item in obj]
-        elif pd.isna(obj):
+            # pandas encodes the frame in C; orjson then parses plain values with no per-cell default calls
+            return orjson.loads(obj.to_json(orient='records', date_format='iso'))
+        elif obj is pd.NaT or obj is pd.NA:
             return None
+    return str(obj)
+
+# Log timestamps are reused for records within this many seconds of each other
+TIMESTAMP_RESOLUTION = 0.001
+_timestamp_cache = (float('-inf'), '')
+
+def _now_iso() -> str:
+    """ISO timestamp for a log record, formatted at most once per TIMESTAMP_RESOLUTION"""
+    global _timestamp_cache
+    mono, iso = _timestamp_cache
+    now = time.monotonic()
+    if now - mono >= TIMESTAMP_RESOLUTION:
+        iso = datetime.now().isoformat()
+        # Swap in a single tuple so concurrent loggers never see a mismatched pair
+        _timestamp_cache = (now, iso)
+    return iso
+
+def _dumps(obj, option=0) -> bytes:
+    """Serialize a log record with orjson"""
+    return orjson.dumps(obj, default=_json_default, option=JSON_OPTIONS | option)
+
+class _DemoFormatter(logging.Formatter):
+    """'time - [name -] level - message' built directly, without %-style template substitution"""
+    
+    def __init__(self, include_name=False):
+        super().__init__()
+        self.include_name = include_name
+    
+    def format(self, record):
+        asctime = self.formatTime(record)
+        if self.include_name:
+            text = f"{asctime} - {record.name} - {record.levelname} - {record.getMessage()}"
         else:
-            return str(obj)
+            text = f"{asctime} - {record.levelname} - {record.getMessage()}"
         
+        # Keep the base class's traceback and stack output
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            text = f"{text}\n{record.exc_text}"
+        if record.stack_info:
+            text = f"{text}\n{self.formatStack(record.stack_info)}"
+        return text
+
+class _LazyJson:
+    """Log message argument that serializes only if a handler formats the record"""
+    __slots__ = ('obj', '_text')
+    
+    def __init__(self, obj):
+        self.obj = obj
+        self._text = None
+    
+    def __str__(self):
+        # Every handler formats the record, so serialize once and reuse the text
+        if self._text is None:
+            self._text = _dumps(self.obj, orjson.OPT_INDENT_2).decode()
+        return self._text
+
+class SAPDemoLogger:
+    def __init__(self, log_dir="logs"):
+        self.log_dir = log_dir
+        os.makedirs(log_dir, exist_ok=True)
+        # path -> (inode, bytes scanned, line count) so stats only scan appended bytes
+        self._stats_cache = {}
+        self._stats_lock = threading.Lock()
+        # interactions.jsonl stays open in append mode; each record is one os.write of a full line
+        self._interactions_fd = os.open(
+            os.path.join(log_dir, 'interactions.jsonl'), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644
+        )
+        atexit.register(os.close, self._interactions_fd)
+        self.setup_logging()
+    
+    def _file_handler(self, filename):
+        """Rotating file handler; the file is opened on the first record"""
+        return logging.handlers.RotatingFileHandler(
+            os.path.join(self.log_dir, filename),
+            maxBytes=LOG_MAX_BYTES,
+            backupCount=LOG_BACKUP_COUNT,
+            delay=True
+        )
+    
     def setup_logging(self):
         """Setup logging configuration"""
+        global _LOGGING_CONFIGURED
+        
+        # Create specific loggers
+        self.app_logger = logging.getLogger('sap_demo.app')
+        self.ai_logger = logging.getLogger('sap_demo.ai')
+        self.data_logger = logging.getLogger('sap_demo.data')
+        
+        if _LOGGING_CONFIGURED:
+            return
+        _LOGGING_CONFIGURED = True
+        
         # Create formatters
-        detailed_formatter = logging.Formatter(
-            '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-        )
-        simple_formatter = logging.Formatter(
-            '%(asctime)s - %(levelname)s - %(message)s'
-        )
+        detailed_formatter = _DemoFormatter(include_name=True)
+        simple_formatter = _DemoFormatter()
         
         # Setup file handlers
         # Detailed logs for debugging
-        debug_handler = logging.FileHandler(
-            os.path.join(self.log_dir, 'sap_demo_debug.log')
-        )
+        debug_handler = self._file_handler('sap_demo_debug.log')
         debug_handler.setLevel(logging.DEBUG)
         debug_handler.setFormatter(detailed_formatter)
         
         # User interaction logs
-        interaction_handler = logging.FileHandler(
-            os.path.join(self.log_dir, 'user_interactions.log')
-        )
+        interaction_handler = self._file_handler('user_interactions.log')
         interaction_handler.setLevel(logging.INFO)
         interaction_handler.setFormatter(simple_formatter)
         
         # Error logs
-        error_handler = logging.FileHandler(
-            os.path.join(self.log_dir, 'errors.log')
-        )
+        error_handler = self._file_handler('errors.log')
         error_handler.setLevel(logging.ERROR)
         error_handler.setFormatter(detailed_formatter)
         
@@ -82,80 +176,133 @@ class SAPDemoLogger:
         root_logger.addHandler(error_handler)
         root_logger.addHandler(console_handler)
         
-        # Create specific loggers
-        self.app_logger = logging.getLogger('sap_demo.app')
-        self.ai_logger = logging.getLogger('sap_demo.ai')
-        self.data_logger = logging.getLogger('sap_demo.data')
-        
     def log_user_interaction(self, user_question, ai_response, processing_time=None, data_context=None):
         """Log user interactions for demo traceability"""
         interaction_data = {
-            'timestamp': datetime.now().isoformat(),
+            'timestamp': _now_iso(),
             'user_question': user_question,
             'ai_response': ai_response,
             'processing_time_seconds': processing_time,
-            'data_context': self.safe_json_serialize(data_context)
+            'data_context': data_context
         }
         
         # Log to file
-        self.app_logger.info(f"User Interaction: {json.dumps(interaction_data, indent=2, default=str)}")
+        self.app_logger.info("User Interaction: %s", _LazyJson(interaction_data))
         
         # Also save to a structured log file
-        with open(os.path.join(self.log_dir, 'interactions.jsonl'), 'a') as f:
-            f.write(json.dumps(interaction_data, default=str) + '\n')
+        os.write(self._interactions_fd, _dumps(interaction_data) + b'\n')
     
     def log_ai_request(self, messages, response, model_used="gpt-4"):
         """Log AI API requests and responses"""
+        # First system and user messages, found in a single pass
+        system_prompt = user_message = None
+        for msg in messages:
+            if msg['role'] == 'system' and system_prompt is None:
+                system_prompt = msg['content']
+            elif msg['role'] == 'user' and user_message is None:
+                user_message = msg['content']
+            if system_prompt is not None and user_message is not None:
+                break
+        
         ai_data = {
-            'timestamp': datetime.now().isoformat(),
+            'timestamp': _now_iso(),
             'model': model_used,
             'messages_count': len(messages),
             'response_length': len(response) if response else 0,
-            'system_prompt': next((msg['content'] for msg in messages if msg['role'] == 'system'), ''),
-            'user_message': next((msg['content'] for msg in messages if msg['role'] == 'user'), '')
+            'system_prompt': system_prompt if system_prompt is not None else '',
+            'user_message': user_message if user_message is not None else ''
         }
         
-        self.ai_logger.info(f"AI Request: {json.dumps(ai_data, indent=2, default=str)}")
+        self.ai_logger.info("AI Request: %s", _LazyJson(ai_data))
     
     def log_data_operation(self, operation, table_name, record_count, filters=None):
         """Log data operations for debugging"""
         data_data = {
-            'timestamp': datetime.now().isoformat(),
+            'timestamp': _now_iso(),
             'operation': operation,
             'table': table_name,
             'record_count': record_count,
-            'filters': self.safe_json_serialize(filters)
+            'filters': filters
         }
         
-        self.data_logger.info(f"Data Operation: {json.dumps(data_data, indent=2, default=str)}")
+        self.data_logger.info("Data Operation: %s", _LazyJson(data_data))
     
     def log_error(self, error_type, error_message, context=None):
         """Log errors with context"""
         error_data = {
-            'timestamp': datetime.now().isoformat(),
+            'timestamp': _now_iso(),
             'error_type': error_type,
             'error_message': str(error_message),
-            'context': self.safe_json_serialize(context)
+            'context': context
         }
         
-        self.app_logger.error(f"Error: {json.dumps(error_data, indent=2, default=str)}")
+        self.app_logger.error("Error: %s", _LazyJson(error_data))
+    
+    def _tail_lines(self, path, limit):
+        """Return the last limit complete lines of a file, reading backwards from the end"""
+        if limit <= 0 or not os.path.exists(path):
+            return []
+        
+        with open(path, 'rb') as f:
+            position = f.seek(0, os.SEEK_END)
+            data = b''
+            # Read blocks until there is one more newline than lines wanted (or the file start)
+            while position > 0 and data.count(b'\n') <= limit:
+                step = min(TAIL_READ_BLOCK, position)
+                position -= step
+                f.seek(position)
+                data = f.read(step) + data
+        
+        lines = data.split(b'\n')
+        if position > 0:
+            # The first piece may be the tail of a longer line
+            lines = lines[1:]
+        return [line for line in lines if line.strip()][-limit:]
     
     def get_recent_interactions(self, limit=10):
         """Get recent user interactions for demo purposes"""
         interactions = []
         interaction_file = os.path.join(self.log_dir, 'interactions.jsonl')
         
-        if os.path.exists(interaction_file):
-            with open(interaction_file, 'r') as f:
-                lines = f.readlines()
-                for line in lines[-limit:]:
-                    try:
-                        interactions.append(json.loads(line.strip()))
-                    except json.JSONDecodeError:
-                        continue
+        for line in self._tail_lines(interaction_file, limit):
+            try:
+                interactions.append(orjson.loads(line))
+            except orjson.JSONDecodeError:
+                continue
         
         return interactions
     
+    def _count_lines(self, path, match=None):
+        """Count lines (optionally only those containing match) in a log file, scanning only new bytes"""
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return 0
+        
+        with self._stats_lock:
+            inode, offset, count = self._stats_cache.get(path, (None, 0, 0))
+            # Start over if the file was rotated or truncated
+            if inode != st.st_ino or st.st_size < offset:
+                offset, count = 0, 0
+            
+            if st.st_size > offset:
+                with open(path, 'rb') as f:
+                    f.seek(offset)
+                    pending = b''
+                    while chunk := f.read(STATS_READ_CHUNK):
+                        data = pending + chunk
+                        # Only count complete lines; a partial last line is picked up next time
+                        end = data.rfind(b'\n') + 1
+                        lines, pending = data[:end], data[end:]
+                        if match is None:
+                            count += lines.count(b'\n')
+                        else:
+                            count += sum(1 for line in lines.split(b'\n') if match in line)
+                        offset += end
+            
+            self._stats_cache[path] = (st.st_ino, offset, count)
+            return count
+    
     def get_demo_stats(self):
         """Get demo statistics for monitoring"""
         stats = {
@@ -166,15 +313,9 @@ class SAPDemoLogger:
         }
         
         # Count interactions
-        interaction_file = os.path.join(self.log_dir, 'interactions.jsonl')
-        if os.path.exists(interaction_file):
-            with open(interaction_file, 'r') as f:
-                stats['total_interactions'] = len(f.readlines())
+        stats['total_interactions'] = self._count_lines(os.path.join(self.log_dir, 'interactions.jsonl'))
         
         # Count errors
-        error_file = os.path.join(self.log_dir, 'errors.log')
-        if os.path.exists(error_file):
-            with open(error_file, 'r') as f:
-                stats['total_errors'] = len([line for line in f if 'ERROR' in line])
+        stats['total_errors'] = self._count_lines(os.path.join(self.log_dir, 'errors.log'), match=b'ERROR')
         
         return stats 
\ No newline at end of file
@@ -3,6 +3,8 @@ SAP AI Demo - Enterprise Prompt Templates
 Contains structured prompts for government-grade SAP data analysis
 """
 
+from functools import lru_cache
+
 # Enterprise-grade system prompt for government SAP analysis
 ENTERPRISE_SYSTEM_PROMPT = """You are an expert SAP ECC financial data analyst assistant designed for government agencies and enterprise organizations, with specialized knowledge for Department of Defense (DoD) and Navy operations. You help users understand and query SAP financial data through natural language with enterprise-grade precision and compliance awareness.
 
@@ -59,8 +61,59 @@ Government & Compliance Focus:
 
 Always provide professional, accurate, and compliance-aware responses suitable for Navy and DoD environments, incorporating relevant Navy terminology and processes when appropriate."""
 
+# Built once; the OpenAI client never mutates the messages it is given
+ENTERPRISE_SYSTEM_MESSAGE = {"role": "system", "content": ENTERPRISE_SYSTEM_PROMPT}
+
+@lru_cache(maxsize=128)
+def _build_schema_context(table_type, total_rows, date_range, company_codes, null_percentage, column_patterns):
+    """Format the schema context message; arguments are hashable so repeat schemas hit the cache"""
+    parts = [f"""
+Data Schema Context:
+- Table Type: {table_type}
+- Total Records: {total_rows:,}
+- Date Range: {date_range}
+- Company Codes: {', '.join(company_codes)}
+- Data Quality: {null_percentage}% null values
+
+Key Columns Available:
+"""]
+    parts.extend(f"- {col_name}: {', '.join(patterns)}\n" for col_name, patterns in column_patterns)
+    return ''.join(parts)
+
+# Function to build the static system/schema messages for an upload
+def create_enterprise_prompt_prefix(schema_analysis=None):
+    """
+    Creates the system and schema messages shared by every query on an upload
+    
+    Args:
+        schema_analysis (dict): Schema analysis results (optional)
+    
+    Returns:
+        list: Leading messages for OpenAI API
+    """
+    if not schema_analysis:
+        return [ENTERPRISE_SYSTEM_MESSAGE]
+    
+    # Add schema context, converting the analysis to hashable values for the cache
+    file_info = schema_analysis.get('file_info', {})
+    data_insights = schema_analysis.get('data_insights', {})
+    schema_context = _build_schema_context(
+        schema_analysis.get('sap_table_type', 'Unknown'),
+        file_info.get('total_rows', 0),
+        str(data_insights.get('date_range', 'Not specified')),
+        tuple(file_info.get('company_codes', [])),
+        data_insights.get('data_quality', {}).get('null_percentage', 0),
+        tuple(
+            (col_name, tuple(col_info['sap_patterns']))
+            for col_name, col_info in schema_analysis.get('column_analysis', {}).items()
+            if col_info.get('sap_patterns')
+        )
+    )
+    
+    return [ENTERPRISE_SYSTEM_MESSAGE, {"role": "system", "content": schema_context}]
+
 # Function to create context-aware prompts for enterprise analysis
-def create_enterprise_query_prompt(user_question, schema_analysis=None, execution_context=None):
+def create_enterprise_query_prompt(user_question, schema_analysis=None, execution_context=None, prompt_prefix=None):
     """
     Creates a context-aware prompt for enterprise SAP queries
     
@@ -68,46 +121,29 @@ def create_enterprise_query_prompt(user_question, schema_analysis=None, executio
         user_question (str): The user's natural language question
         schema_analysis (dict): Schema analysis results (optional)
         execution_context (dict): Query execution results (optional)
+        prompt_prefix (list): Prebuilt system/schema messages for the upload (optional)
     
     Returns:
         list: Messages for OpenAI API
     """
-    messages = [
-        {"role": "system", "content": ENTERPRISE_SYSTEM_PROMPT}
-    ]
-    
-    # Add schema context if available
-    if schema_analysis:
-        schema_context = f"""
-Data Schema Context:
-- Table Type: {schema_analysis.get('sap_table_type', 'Unknown')}
-- Total Records: {schema_analysis.get('file_info', {}).get('total_rows', 0):,}
-- Date Range: {schema_analysis.get('data_insights', {}).get('date_range', 'Not specified')}
-- Company Codes: {', '.join(schema_analysis.get('file_info', {}).get('company_codes', []))}
-- Data Quality: {schema_analysis.get('data_insights', {}).get('data_quality', {}).get('null_percentage', 0)}% null values
-
-Key Columns Available:
-"""
-        for col_name, col_info in schema_analysis.get('column_analysis', {}).items():
-            if col_info.get('sap_patterns'):
-                schema_context += f"- {col_name}: {', '.join(col_info['sap_patterns'])}\n"
-        
-        messages.append({"role": "system", "content": schema_context})
+    if prompt_prefix is not None:
+        messages = list(prompt_prefix)
+    else:
+        messages = create_enterprise_prompt_prefix(schema_analysis)
     
     # Add execution context if available
     if execution_context:
-        exec_context = f"""
+        parts = [f"""
 Query Execution Results:
 - Records Returned: {execution_context.get('row_count', 0):,}
 - Processing Time: {execution_context.get('execution_time', 0):.2f} seconds
 - Query Type: {execution_context.get('query_type', 'Unknown')}
 
 Analysis Summary:
-"""
-        for insight in execution_context.get('insights', []):
-            exec_context += f"- {insight}\n"
+"""]
+        parts.extend(f"- {insight}\n" for insight in execution_context.get('insights', []))
         
-        messages.append({"role": "system", "content": exec_context})
+        messages.append({"role": "system", "content": ''.join(parts)})
     
     # Add the user's question
     messages.append({"role": "user", "content": user_question})
@@ -166,6 +202,26 @@ DATA_QUALITY_QUERIES = [
     "Show data integrity checks and validation results"
 ]
 
+# Suggestion lists are static, so slice them once at import
+BASE_SUGGESTIONS = tuple(ENTERPRISE_EXAMPLE_QUERIES[:6])
+
+ROLE_SUGGESTIONS = {
+    "auditor": tuple(COMPLIANCE_QUERIES[:4]),
+    "manager": tuple(GOVERNMENT_REPORTING_QUERIES[:4]),
+    "data_steward": tuple(DATA_QUALITY_QUERIES[:4])
+}
+
+TABLE_SUGGESTIONS = {
+    "BKPF": (
+        "Show document posting patterns by user",
+        "Analyze document type distribution by period"
+    ),
+    "BSEG": (
+        "Show account balance trends over time",
+        "Analyze posting key patterns and anomalies"
+    )
+}
+
 # Function to get context-appropriate query suggestions
 def get_query_suggestions(schema_analysis=None, user_role="analyst"):
     """
@@ -178,30 +234,10 @@ def get_query_suggestions(schema_analysis=None, user_role="analyst"):
     Returns:
         list: Relevant query suggestions
     """
-    base_suggestions = ENTERPRISE_EXAMPLE_QUERIES[:6]
-    
-    if user_role == "auditor":
-        base_suggestions.extend(COMPLIANCE_QUERIES[:4])
-    elif user_role == "manager":
-        base_suggestions.extend(GOVERNMENT_REPORTING_QUERIES[:4])
-    elif user_role == "data_steward":
-        base_suggestions.extend(DATA_QUALITY_QUERIES[:4])
-    
-    # Add schema-specific suggestions
-    if schema_analysis:
-        sap_table_type = schema_analysis.get('sap_table_type', '')
-        if sap_table_type == 'BKPF':
-            base_suggestions.extend([
-                "Show document posting patterns by user",
-                "Analyze document type distribution by period"
-            ])
-        elif sap_table_type == 'BSEG':
-            base_suggestions.extend([
-                "Show account balance trends over time",
-                "Analyze posting key patterns and anomalies"
-            ])
+    sap_table_type = schema_analysis.get('sap_table_type', '') if schema_analysis else ''
+    suggestions = BASE_SUGGESTIONS + ROLE_SUGGESTIONS.get(user_role, ()) + TABLE_SUGGESTIONS.get(sap_table_type, ())
     
-    return base_suggestions[:10]  # Limit to 10 suggestions
+    return list(suggestions[:10])  # Limit to 10 suggestions
 
 # Function to create compliance-aware analysis prompts
 def create_compliance_analysis_prompt(query_results, schema_analysis):
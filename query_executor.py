@@ -9,35 +9,155 @@ from typing import Dict, List, Any, Optional, Tuple
 import logging
 from datetime import datetime, timedelta
 import traceback
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from markupsafe import Markup
+
+# Comparison filters evaluated directly on a column's numpy array
+NUMERIC_COMPARISONS = {
+    '>': np.greater,
+    '<': np.less,
+    '>=': np.greater_equal,
+    '<=': np.less_equal,
+    '==': np.equal,
+    '!=': np.not_equal
+}
+
+# A 'contains' value without these characters is matched as a plain substring
+REGEX_METACHARACTERS = frozenset('.^$*+?{}[]\\|()')
+
+# Compact integer types for derived date parts
+DATE_PART_DTYPES = {'year': np.int16, 'quarter': np.int8}
+
+# SAP field patterns (from the schema analysis) that identify the columns business insights use
+SAP_COLUMN_ROLES = {
+    'date': ('posting_date',),
+    'vendor': ('vendor_number',),
+    'customer': ('customer_number',),
+    'amount': ('local_amount', 'document_amount'),
+}
+
+# Aggregations that SeriesGroupBy exposes as direct methods
+GROUPBY_REDUCTIONS = frozenset({'sum', 'mean', 'count', 'min', 'max', 'nunique'})
+
+# Uploads at least this large run several requested business analyses concurrently
+PARALLEL_INSIGHTS_MIN_ROWS = 200_000
+
+# Filter masks kept per executor, so repeated predicates on an upload skip the scan
+PREDICATE_CACHE_SIZE = 32
+
+# Words that switch natural language responses to the Navy/DoD wording
+NAVY_KEYWORDS = ('navy', 'military', 'dod')
+
+# Schema explanation responses keyed by (question intent, Navy context, table type or None)
+SCHEMA_RESPONSES = {
+    ('what', True, 'BSEG'): "This is a **BSEG (Accounting Document Segment)** table containing {total_rows:,} individual financial transaction line items. As a Navy professional, you can use this data for:\n• Tracking Navy procurement and vendor payments\n• Monitoring budget execution across commands\n• Auditing financial transactions for DoD compliance\n• Analyzing spending patterns by appropriation categories\n• Supporting Navy financial reporting requirements\n\n{schema_summary}",
+    ('what', True, 'BKPF'): "This is a **BKPF (Accounting Document Header)** table containing {total_rows:,} complete accounting documents. For Navy operations, this supports:\n• Document-level audit trails for DoD compliance\n• Approval workflow tracking for Navy acquisitions\n• Financial reporting for Navy commands and programs\n• Budget execution monitoring and analysis\n• Supporting Navy financial transparency initiatives\n\n{schema_summary}",
+    ('what', True, None): "This is a **{table_type}** table with {total_rows:,} records and {total_columns} columns. For Navy and DoD operations, this data supports:\n• Financial analysis and reporting requirements\n• Compliance monitoring and audit preparation\n• Budget execution and appropriation tracking\n• Navy-specific procurement and vendor management\n\n{schema_summary}",
+    ('what', False, 'BSEG'): "This is a **BSEG (Accounting Document Segment)** table that contains {total_rows:,} individual line items from accounting documents. Each row represents a single financial transaction entry with {total_columns} different data fields. This table is used for detailed financial analysis, transaction tracking, and audit purposes. {schema_summary}",
+    ('what', False, 'BKPF'): "This is a **BKPF (Accounting Document Header)** table that contains {total_rows:,} complete accounting documents. Each row represents a full financial document with {total_columns} different data fields. This table is used for document-level analysis, approval workflows, and compliance reporting. {schema_summary}",
+    ('what', False, None): "This is a **{table_type}** table containing {total_rows:,} records with {total_columns} columns of data. {schema_summary}",
+    ('explain', True, None): "Let me explain this {table_type} table for Navy operations: It contains {total_rows:,} records with {total_columns} columns. {schema_summary} You can use this data for Navy financial analysis, DoD compliance reporting, budget execution monitoring, and supporting Navy acquisition processes.",
+    ('explain', False, None): "Let me explain this {table_type} table: It contains {total_rows:,} records with {total_columns} columns. {schema_summary} You can use this data for financial analysis, reporting, and business intelligence purposes.",
+    ('other', False, None): "This {table_type} table has {total_rows:,} records and {total_columns} columns. {schema_summary}",
+}
+
+# Business question topics, checked in order; the first matching keyword picks the response
+BUSINESS_TOPICS = (
+    ('overdue', ('overdue',)),
+    ('vendor', ('vendor',)),
+    ('customer', ('customer',)),
+    ('financial', ('invoice', 'payment')),
+)
+
+# Business analysis responses keyed by (Navy context, topic)
+BUSINESS_RESPONSES = {
+    (True, 'overdue'): "Based on your Navy-related question about overdue items: {insights} This analysis helps identify items that need attention for Navy payment processing, vendor management, and cash flow management across Navy commands.",
+    (True, 'vendor'): "Regarding your Navy vendor-related question: {insights} This information helps you understand Navy vendor relationships, procurement patterns, and supports Navy acquisition compliance.",
+    (True, 'customer'): "About your Navy customer inquiry: {insights} This data provides insights into Navy customer relationships, inter-command transactions, and Navy financial patterns.",
+    (True, 'financial'): "For your Navy financial question: {insights} This analysis helps understand Navy payment patterns, budget execution, and financial performance across Navy programs.",
+    (True, 'general'): "Here's what I found based on your Navy-related question: {insights} This information provides valuable insights for Navy decision-making, budget management, and DoD compliance.",
+    (False, 'overdue'): "Based on your question about overdue items, here's what I found: {insights} This analysis helps identify items that need attention for payment processing and cash flow management.",
+    (False, 'vendor'): "Regarding your vendor-related question: {insights} This information can help you understand vendor relationships and payment patterns.",
+    (False, 'customer'): "About your customer inquiry: {insights} This data provides insights into customer relationships and transaction patterns.",
+    (False, 'financial'): "For your financial question: {insights} This analysis helps understand payment patterns and financial performance.",
+    (False, 'general'): "Here's what I found based on your question: {insights} This information provides valuable business insights for decision-making.",
+}
 
 class SAPQueryExecutor:
     def __init__(self, df: pd.DataFrame, schema_analysis: Dict[str, Any]):
-        self.df = df.copy()
+        # Shallow copy: preprocessing replaces whole columns, which never touches the caller's frame,
+        # and every query step below builds new frames rather than modifying self.df
+        self.df = df.copy(deep=False)
         self.schema_analysis = schema_analysis
         self.column_analysis = schema_analysis.get('column_analysis', {})
+        # Column -> data category ('numeric', 'date', 'categorical', ...) from the schema analysis
+        self._column_categories = {col: info.get('data_category') for col, info in self.column_analysis.items()}
         self.logger = logging.getLogger(__name__)
+        self._predicate_cache = OrderedDict()
+        self._predicate_lock = threading.Lock()
+        # Per-thread snapshot of "now" for the query being executed
+        self._query_clock = threading.local()
+        # (date column, 'year' | 'quarter') -> derived int array for self.df
+        self._date_parts = {}
         
         # Preprocess the dataframe
         self._preprocess_dataframe()
+        
+        # Column lookups used on every query, resolved once
+        self._column_names = self.df.columns.tolist()
+        self._columns_set = set(self._column_names)
+        sap_columns = self._find_sap_columns()
+        self._date_col = sap_columns['date']
+        self._vendor_col = sap_columns['vendor']
+        self._customer_col = sap_columns['customer']
+        self._amount_col = sap_columns['amount']
+        # Date columns already in ascending order (SAP exports usually are, by posting date);
+        # range filters on these binary-search the cutoff instead of scanning
+        self._sorted_date_cols = {
+            col for col in self.df.columns
+            if self.df[col].to_numpy().dtype.kind == 'M' and self.df[col].is_monotonic_increasing
+        }
     
     def _preprocess_dataframe(self):
         """Preprocess the dataframe for better querying"""
         try:
-            # Convert date columns
-            for col_name, col_info in self.column_analysis.items():
-                if col_info.get('data_category') == 'date':
-                    try:
-                        self.df[col_name] = pd.to_datetime(self.df[col_name], errors='coerce')
-                    except:
-                        pass
+            # Collect the columns that still need converting in one pass
+            # (columns already typed at upload time are skipped)
+            date_cols, numeric_cols = [], []
+            for col_name, category in self._column_categories.items():
+                if col_name not in self.df.columns:
+                    continue
+                if category == 'date' and not pd.api.types.is_datetime64_any_dtype(self.df[col_name]):
+                    date_cols.append(col_name)
+                elif category == 'numeric' and not pd.api.types.is_numeric_dtype(self.df[col_name]):
+                    numeric_cols.append(col_name)
             
-            # Convert numeric columns
-            for col_name, col_info in self.column_analysis.items():
-                if col_info.get('data_category') == 'numeric':
-                    try:
-                        self.df[col_name] = pd.to_numeric(self.df[col_name], errors='coerce')
-                    except:
-                        pass
+            # Convert date columns; cache=True parses each distinct date string once
+            for col_name in date_cols:
+                self.df[col_name] = pd.to_datetime(self.df[col_name], errors='coerce', cache=True)
+            
+            # Convert numeric columns in a single assignment
+            if numeric_cols:
+                self.df[numeric_cols] = self.df[numeric_cols].apply(pd.to_numeric, errors='coerce')
+            
+            # Shrink integer columns (quantities, fiscal periods) to the smallest fitting width;
+            # float amounts keep float64 so sums stay exact to the cent
+            int_cols = [col_name for col_name, category in self._column_categories.items()
+                        if category == 'numeric' and col_name in self.df.columns
+                        and pd.api.types.is_signed_integer_dtype(self.df[col_name])
+                        and isinstance(self.df[col_name].dtype, np.dtype)]
+            if int_cols:
+                self.df[int_cols] = self.df[int_cols].apply(pd.to_numeric, downcast='integer')
+            
+            # Store low-cardinality text columns (vendor, customer, document type) as categoricals
+            # once, so grouping and counting work on integer codes in every query
+            for col_name, category in self._column_categories.items():
+                if (category == 'categorical' and col_name in self.df.columns
+                        and pd.api.types.is_string_dtype(self.df[col_name])
+                        and self.df[col_name].nunique() < len(self.df) // 4):
+                    self.df[col_name] = self.df[col_name].astype('category')
             
             self.logger.info("Dataframe preprocessing completed")
             
@@ -56,9 +176,11 @@ class SAPQueryExecutor:
         """
         try:
             start_time = datetime.now()
+            # Every date comparison in this query uses the same "now"
+            self._query_clock.now = np.datetime64(start_time)
             
             # Debug: Log DataFrame columns at the start of execution
-            self.logger.info(f"[DEBUG] DataFrame columns at execution: {list(self.df.columns)}")
+            self.logger.info("[DEBUG] DataFrame columns at execution: %s", self._column_names)
             self.logger.info(f"[DEBUG] Query plan grouping: {query_plan.get('grouping', [])}, aggregation: {query_plan.get('aggregation', {})}")
             
             # Handle schema explanation requests
@@ -69,13 +191,21 @@ class SAPQueryExecutor:
             if query_plan.get('action') == 'business_analysis':
                 return self._execute_business_analysis(query_plan, start_time)
             
-            # Start with a copy of the dataframe
-            result_df = self.df.copy()
+            # Start from the dataframe itself; each step returns a new frame
+            result_df = self.df
             execution_log = []
             
+            # Only the first `limit` matches can reach the result when no later step
+            # reorders, aggregates or filters further, so skip materializing the rest
+            row_limit = None
+            if query_plan.get('limit') and not any(
+                query_plan.get(step) for step in ('time_period', 'grouping', 'aggregation', 'sorting')
+            ):
+                row_limit = query_plan['limit']
+            
             # Step 1: Apply filters
             if query_plan.get('filters'):
-                result_df, filter_log = self._apply_filters(result_df, query_plan['filters'])
+                result_df, filter_log = self._apply_filters(result_df, query_plan['filters'], row_limit)
                 execution_log.extend(filter_log)
             
             # Step 2: Apply time period filters
@@ -90,7 +220,7 @@ class SAPQueryExecutor:
             
             # Step 4: Apply sorting
             if query_plan.get('sorting'):
-                result_df, sort_log = self._apply_sorting(result_df, query_plan['sorting'])
+                result_df, sort_log = self._apply_sorting(result_df, query_plan['sorting'], query_plan.get('limit'))
                 execution_log.extend(sort_log)
             
             # Step 5: Apply limit
@@ -104,7 +234,7 @@ class SAPQueryExecutor:
             results = self._prepare_results(result_df, query_plan, execution_time, execution_log)
 
             # --- Global Table Dump Block: Never return the full table as a fallback ---
-            is_full_table = len(result_df) > 0 and len(result_df) == len(self.df) and set(result_df.columns) == set(self.df.columns)
+            is_full_table = len(result_df) > 0 and len(result_df) == len(self.df) and set(result_df.columns) == self._columns_set
             if is_full_table:
                 return {
                     'status': 'error',
@@ -130,7 +260,8 @@ class SAPQueryExecutor:
                     'natural_language_response': 'Sorry, I am unable to answer this question with the current data.'
                 }
             # Prevent returning results that are just repeated column headers
-            if all(result_df.iloc[i].tolist() == result_df.columns.tolist() for i in range(min(len(result_df), 5))):
+            header = np.asarray(result_df.columns, dtype=object)
+            if (result_df.head(5).to_numpy(dtype=object) == header).all():
                 return {
                     'status': 'error',
                     'message': 'Sorry, I am unable to answer this question with the current data.',
@@ -165,9 +296,10 @@ class SAPQueryExecutor:
             original_question = query_plan.get('original_question', '')
             
             # Generate schema explanation
-            explanation = self._generate_schema_explanation(
+            # Wrapped once here so the template does not re-check it on render
+            explanation = Markup(self._generate_schema_explanation(
                 table_type, column_analysis, file_info, schema_summary, report_identification
-            )
+            ))
             
             # Generate natural language response
             nl_response = self._generate_natural_language_response(original_question, 'schema', {
@@ -278,7 +410,7 @@ class SAPQueryExecutor:
             question_lower = question.lower()
             
             # Generate business insights
-            insights = self._generate_business_insights(question_lower)
+            insights = Markup(self._generate_business_insights(question_lower))
             
             # Generate natural language response
             nl_response = self._generate_natural_language_response(question, 'business', {
@@ -309,20 +441,30 @@ class SAPQueryExecutor:
     
     def _generate_business_insights(self, question: str) -> str:
         """Generate simplified business insights"""
-        insights = []
+        analyses = []
         
         # Simple keyword-based analysis
         if 'overdue' in question:
-            insights.append(self._analyze_overdue_items())
+            analyses.append(self._analyze_overdue_items)
         
         if 'vendor' in question:
-            insights.append(self._analyze_vendor_data())
+            analyses.append(self._analyze_vendor_data)
         
         if 'customer' in question:
-            insights.append(self._analyze_customer_data())
+            analyses.append(self._analyze_customer_data)
         
         if 'invoice' in question or 'payment' in question:
-            insights.append(self._analyze_financial_data())
+            analyses.append(self._analyze_financial_data)
+        
+        # The analyses scan different columns, so on large uploads run them side by side
+        # (the numpy/pandas reductions release the GIL); results keep the keyword order
+        if len(analyses) > 1 and len(self.df) >= PARALLEL_INSIGHTS_MIN_ROWS:
+            now = self._now()
+            with ThreadPoolExecutor(max_workers=len(analyses)) as pool:
+                futures = [pool.submit(self._run_at, now, analysis) for analysis in analyses]
+                insights = [future.result() for future in futures]
+        else:
+            insights = [analysis() for analysis in analyses]
         
         # If no specific analysis, provide general insights
         if not insights:
@@ -330,12 +472,20 @@ class SAPQueryExecutor:
         
         return "\n\n".join(insights)
     
+    def _run_at(self, now: np.datetime64, analysis) -> str:
+        """Run an analysis on a worker thread with the calling query's snapshot of now"""
+        self._query_clock.now = now
+        return analysis()
+    
     def _analyze_overdue_items(self) -> str:
         """Simple overdue analysis"""
         try:
-            date_col = self._find_date_column()
-            if date_col and date_col in self.df.columns:
-                overdue_count = (pd.to_datetime(self.df[date_col], errors='coerce') < datetime.now()).sum()
+            date_col = self._date_col
+            if date_col and date_col in self._columns_set:
+                if self.df[date_col].to_numpy().dtype.kind == 'M':
+                    overdue_count = int(self._compare_dates(self.df, date_col, np.less, self._now()).sum())
+                else:
+                    overdue_count = (pd.to_datetime(self.df[date_col], errors='coerce') < self._now()).sum()
                 total_count = len(self.df)
                 return f"**Overdue Analysis:** {overdue_count}/{total_count} items overdue ({overdue_count/total_count*100:.1f}%)"
             return "**Overdue Analysis:** No date column found"
@@ -345,8 +495,8 @@ class SAPQueryExecutor:
     def _analyze_vendor_data(self) -> str:
         """Simple vendor analysis"""
         try:
-            vendor_col = self._find_vendor_column()
-            if vendor_col and vendor_col in self.df.columns:
+            vendor_col = self._vendor_col
+            if vendor_col and vendor_col in self._columns_set:
                 vendor_count = self.df[vendor_col].nunique()
                 return f"**Vendor Analysis:** {vendor_count} unique vendors found"
             return "**Vendor Analysis:** No vendor data found"
@@ -356,8 +506,8 @@ class SAPQueryExecutor:
     def _analyze_customer_data(self) -> str:
         """Simple customer analysis"""
         try:
-            customer_col = self._find_customer_column()
-            if customer_col and customer_col in self.df.columns:
+            customer_col = self._customer_col
+            if customer_col and customer_col in self._columns_set:
                 customer_count = self.df[customer_col].nunique()
                 return f"**Customer Analysis:** {customer_count} unique customers found"
             return "**Customer Analysis:** No customer data found"
@@ -367,8 +517,8 @@ class SAPQueryExecutor:
     def _analyze_financial_data(self) -> str:
         """Simple financial analysis"""
         try:
-            amount_col = self._find_amount_column()
-            if amount_col and amount_col in self.df.columns:
+            amount_col = self._amount_col
+            if amount_col and amount_col in self._columns_set:
                 total = self.df[amount_col].sum()
                 avg = self.df[amount_col].mean()
                 return f"**Financial Analysis:** Total: ${total:,.2f}, Average: ${avg:,.2f}"
@@ -396,10 +546,15 @@ class SAPQueryExecutor:
         
         return insights
     
-    def _apply_filters(self, df: pd.DataFrame, filters: List[Dict[str, Any]]) -> Tuple[pd.DataFrame, List[Dict[str, Any]]]:
-        """Apply filters to the dataframe"""
-        result_df = df.copy()
+    def _apply_filters(self, df: pd.DataFrame, filters: List[Dict[str, Any]],
+                       row_limit: Optional[int] = None) -> Tuple[pd.DataFrame, List[Dict[str, Any]]]:
+        """Apply filters to the dataframe, keeping only the first row_limit matches if given"""
         log_entries = []
+        columns = self._columns_set if df is self.df else set(df.columns)
+        
+        # AND every filter into one mask and slice the frame once at the end
+        combined = np.ones(len(df), dtype=bool)
+        rows_remaining = len(df)
         
         for i, filter_cond in enumerate(filters):
             try:
@@ -407,7 +562,7 @@ class SAPQueryExecutor:
                 operator = filter_cond['operator']
                 value = filter_cond['value']
                 
-                if column not in result_df.columns:
+                if column not in columns:
                     log_entries.append({
                         'step': f'filter_{i+1}',
                         'status': 'error',
@@ -415,43 +570,26 @@ class SAPQueryExecutor:
                     })
                     continue
                 
-                # Apply filter based on operator
-                if operator == '>':
-                    mask = result_df[column] > value
-                elif operator == '<':
-                    mask = result_df[column] < value
-                elif operator == '>=':
-                    mask = result_df[column] >= value
-                elif operator == '<=':
-                    mask = result_df[column] <= value
-                elif operator == '==':
-                    mask = result_df[column] == value
-                elif operator == '!=':
-                    mask = result_df[column] != value
-                elif operator == 'in':
-                    mask = result_df[column].isin(value)
-                elif operator == 'contains':
-                    mask = result_df[column].str.contains(value, case=False, na=False)
-                elif operator == 'overdue':
-                    mask = self._apply_overdue_filter(result_df, column)
-                elif operator == 'relative_date':
-                    mask = self._apply_relative_date_filter(result_df, column, value)
-                elif operator == 'year_range':
-                    mask = self._apply_year_range_filter(result_df, column, value)
-                elif operator == 'quarter':
-                    mask = self._apply_quarter_filter(result_df, column, value)
-                else:
-                    log_entries.append({
-                        'step': f'filter_{i+1}',
-                        'status': 'error',
-                        'message': f"Unknown operator: {operator}"
-                    })
-                    continue
+                # Reuse the mask from an earlier query with the same predicate on this frame
+                cache_key = self._predicate_key(column, operator, value) if df is self.df else None
+                mask = self._cached_predicate(cache_key) if cache_key else None
+                if mask is None:
+                    mask = self._filter_mask(df, column, operator, value)
+                    if mask is None:
+                        log_entries.append({
+                            'step': f'filter_{i+1}',
+                            'status': 'error',
+                            'message': f"Unknown operator: {operator}"
+                        })
+                        continue
+                    if cache_key:
+                        self._store_predicate(cache_key, mask)
                 
                 # Apply the filter
-                initial_count = len(result_df)
-                result_df = result_df[mask]
-                final_count = len(result_df)
+                initial_count = rows_remaining
+                combined &= mask
+                rows_remaining = int(combined.sum())
+                final_count = rows_remaining
                 
                 log_entries.append({
                     'step': f'filter_{i+1}',
@@ -474,55 +612,178 @@ class SAPQueryExecutor:
                     'message': f"Error applying filter: {str(e)}"
                 })
         
-        return result_df, log_entries
+        if row_limit is not None and rows_remaining > row_limit:
+            return df.iloc[np.flatnonzero(combined)[:row_limit]], log_entries
+        if rows_remaining < len(df):
+            return df[combined], log_entries
+        return df, log_entries
+    
+    def _filter_mask(self, df: pd.DataFrame, column: str, operator: str, value: Any) -> Optional[np.ndarray]:
+        """Boolean mask for one filter condition, or None for an unknown operator"""
+        # Apply filter based on operator; numeric comparisons skip the pandas Series wrapper
+        values = df[column].to_numpy() if operator in NUMERIC_COMPARISONS else None
+        if (values is not None and values.dtype.kind in 'iuf'
+                and isinstance(value, (int, float, np.number)) and not isinstance(value, bool)):
+            mask = NUMERIC_COMPARISONS[operator](values, value)
+        elif operator == '>':
+            mask = df[column] > value
+        elif operator == '<':
+            mask = df[column] < value
+        elif operator == '>=':
+            mask = df[column] >= value
+        elif operator == '<=':
+            mask = df[column] <= value
+        elif operator == '==':
+            mask = df[column] == value
+        elif operator == '!=':
+            mask = df[column] != value
+        elif operator == 'in':
+            mask = df[column].isin(value)
+        elif operator == 'contains':
+            mask = self._contains_mask(df[column], value)
+        elif operator == 'overdue':
+            mask = self._apply_overdue_filter(df, column)
+        elif operator == 'relative_date':
+            mask = self._apply_relative_date_filter(df, column, value)
+        elif operator == 'year_range':
+            mask = self._apply_year_range_filter(df, column, value)
+        elif operator == 'quarter':
+            mask = self._apply_quarter_filter(df, column, value)
+        else:
+            return None
+        return np.asarray(mask, dtype=bool)
+    
+    def _contains_mask(self, series: pd.Series, value: Any) -> np.ndarray:
+        """Case-insensitive contains; literal values skip the regex engine, categoricals match each category once"""
+        regex = not (isinstance(value, str) and not any(ch in REGEX_METACHARACTERS for ch in value))
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            matches = series.cat.categories.str.contains(value, case=False, regex=regex, na=False)
+            # Code -1 (missing) picks the trailing False
+            return np.append(np.asarray(matches, dtype=bool), False)[series.cat.codes.to_numpy()]
+        return series.str.contains(value, case=False, regex=regex, na=False)
+    
+    def _predicate_key(self, column: str, operator: str, value: Any) -> Optional[tuple]:
+        """Cache key for a filter predicate, or None for predicates relative to the query's now"""
+        if operator in ('overdue', 'relative_date'):
+            return None
+        return (column, operator, repr(value))
+    
+    def _cached_predicate(self, key: tuple) -> Optional[np.ndarray]:
+        """Look up a cached filter mask, marking it most recently used"""
+        with self._predicate_lock:
+            mask = self._predicate_cache.get(key)
+            if mask is not None:
+                self._predicate_cache.move_to_end(key)
+            return mask
+    
+    def _store_predicate(self, key: tuple, mask: np.ndarray):
+        """Cache a filter mask, evicting the least recently used one when full"""
+        mask.flags.writeable = False
+        with self._predicate_lock:
+            self._predicate_cache[key] = mask
+            self._predicate_cache.move_to_end(key)
+            if len(self._predicate_cache) > PREDICATE_CACHE_SIZE:
+                self._predicate_cache.popitem(last=False)
+    
+    def _compare_dates(self, df: pd.DataFrame, date_column: str, compare, cutoff: datetime):
+        """Compare a date column against a cutoff, on the datetime64 array when the column is naive"""
+        values = df[date_column].to_numpy()
+        if values.dtype.kind == 'M':
+            cutoff = np.datetime64(cutoff)
+            if compare is np.greater_equal:
+                return self._sorted_date_range(df, date_column, cutoff, None)
+            if compare is np.less:
+                return self._sorted_date_range(df, date_column, None, cutoff)
+            return compare(values, cutoff)
+        return compare(df[date_column], cutoff)
+    
+    def _sorted_date_range(self, df: pd.DataFrame, date_column: str, start, end) -> np.ndarray:
+        """Mask for start <= date < end (either bound may be None), by searchsorted on sorted columns"""
+        values = df[date_column].to_numpy()
+        if df is not self.df or date_column not in self._sorted_date_cols:
+            mask = np.ones(len(values), dtype=bool)
+            if start is not None:
+                mask &= values >= start
+            if end is not None:
+                mask &= values < end
+            return mask
+        
+        lo = 0 if start is None else values.searchsorted(start, side='left')
+        hi = len(values) if end is None else values.searchsorted(end, side='left')
+        mask = np.zeros(len(values), dtype=bool)
+        mask[lo:hi] = True
+        return mask
+    
+    def _now(self) -> np.datetime64:
+        """Snapshot of now taken by the latest execute_query on this thread, else the wall clock"""
+        now = getattr(self._query_clock, 'now', None)
+        return now if now is not None else np.datetime64(datetime.now())
     
     def _apply_overdue_filter(self, df: pd.DataFrame, date_column: str) -> pd.Series:
         """Apply overdue filter (items past due date)"""
-        today = datetime.now()
-        return df[date_column] < today
+        return self._compare_dates(df, date_column, np.less, self._now())
     
     def _apply_relative_date_filter(self, df: pd.DataFrame, date_column: str, value: Dict[str, Any]) -> pd.Series:
         """Apply relative date filter (e.g., last 30 days)"""
         number = value['number']
         unit = value['unit']
+        now = self._now()
         
         if unit == 'day':
-            cutoff_date = datetime.now() - timedelta(days=number)
+            cutoff_date = now - timedelta(days=number)
         elif unit == 'week':
-            cutoff_date = datetime.now() - timedelta(weeks=number)
+            cutoff_date = now - timedelta(weeks=number)
         elif unit == 'month':
-            cutoff_date = datetime.now() - timedelta(days=number*30)
+            cutoff_date = now - timedelta(days=number*30)
         elif unit == 'quarter':
-            cutoff_date = datetime.now() - timedelta(days=number*90)
+            cutoff_date = now - timedelta(days=number*90)
         elif unit == 'year':
-            cutoff_date = datetime.now() - timedelta(days=number*365)
+            cutoff_date = now - timedelta(days=number*365)
         else:
-            cutoff_date = datetime.now() - timedelta(days=number)
+            cutoff_date = now - timedelta(days=number)
+        
+        return self._compare_dates(df, date_column, np.greater_equal, cutoff_date)
+    
+    def _date_part(self, df: pd.DataFrame, date_column: str, part: str) -> np.ndarray:
+        """Year or quarter of each date as a small int array (0 for missing), cached for the full frame"""
+        key = (date_column, part)
+        if df is self.df and key in self._date_parts:
+            return self._date_parts[key]
         
-        return df[date_column] >= cutoff_date
+        values = getattr(df[date_column].dt, part).fillna(0).to_numpy(dtype=DATE_PART_DTYPES[part])
+        if df is self.df:
+            values.flags.writeable = False
+            self._date_parts[key] = values
+        return values
     
     def _apply_year_range_filter(self, df: pd.DataFrame, date_column: str, value: Dict[str, Any]) -> pd.Series:
         """Apply year range filter"""
         start_year = value['start']
         end_year = value['end']
         
-        return (df[date_column].dt.year >= start_year) & (df[date_column].dt.year <= end_year)
+        if df is self.df and date_column in self._sorted_date_cols:
+            start = np.datetime64(f"{int(start_year):04d}-01-01")
+            end = np.datetime64(f"{int(end_year) + 1:04d}-01-01")
+            return self._sorted_date_range(df, date_column, start, end)
+        
+        years = self._date_part(df, date_column, 'year')
+        return (years >= start_year) & (years <= end_year)
     
     def _apply_quarter_filter(self, df: pd.DataFrame, date_column: str, quarter: int) -> pd.Series:
         """Apply quarter filter"""
-        return df[date_column].dt.quarter == quarter
+        return self._date_part(df, date_column, 'quarter') == quarter
     
     def _apply_time_period_filter(self, df: pd.DataFrame, time_period: Dict[str, Any]) -> Tuple[pd.DataFrame, List[Dict[str, Any]]]:
         """Apply time period filter"""
-        result_df = df.copy()
+        result_df = df
         log_entries = []
         
         if 'quarter' in time_period:
             quarter = time_period['quarter']
-            date_column = self._find_date_column()
+            date_column = self._date_col
             
             if date_column:
-                mask = result_df[date_column].dt.quarter == quarter
+                mask = self._date_part(result_df, date_column, 'quarter') == quarter
                 initial_count = len(result_df)
                 result_df = result_df[mask]
                 final_count = len(result_df)
@@ -543,7 +804,7 @@ class SAPQueryExecutor:
     
     def _apply_grouping_aggregation(self, df: pd.DataFrame, query_plan: Dict[str, Any]) -> Tuple[pd.DataFrame, List[Dict[str, Any]]]:
         """Apply grouping and aggregation"""
-        result_df = df.copy()
+        result_df = df
         log_entries = []
 
         grouping = query_plan.get('grouping', [])
@@ -552,19 +813,16 @@ class SAPQueryExecutor:
         limit = query_plan.get('limit', None)
 
         # Debug: Log columns and grouping/aggregation before applying
-        self.logger.info(f"[DEBUG] _apply_grouping_aggregation: DataFrame columns: {list(result_df.columns)}")
+        self.logger.info("[DEBUG] _apply_grouping_aggregation: DataFrame columns: %s",
+                         self._column_names if result_df is self.df else result_df.columns.tolist())
         self.logger.info(f"[DEBUG] _apply_grouping_aggregation: grouping={grouping}, aggregation={aggregation}")
 
         # Patch: If grouping by a single column with count aggregation, do value_counts
         if len(grouping) == 1 and aggregation and '*' in aggregation and aggregation['*'] == 'count':
             col = grouping[0]
             if col in result_df.columns:
-                vc = result_df[col].value_counts().reset_index()
-                vc.columns = [col, 'count']
-                # Apply sorting and limit if present
-                if limit:
-                    vc = vc.head(limit)
-                result_df = vc
+                # Counts sorted descending (ties in order of first appearance), limited if requested
+                result_df = self._top_value_counts(result_df[col], limit)
                 log_entries.append({
                     'step': 'grouping_aggregation',
                     'status': 'success',
@@ -577,17 +835,19 @@ class SAPQueryExecutor:
                 return result_df, log_entries
         
         try:
+            agg_dict = self._build_agg_dict(aggregation)
+            
             if grouping and aggregation:
                 # Group by specified columns and apply aggregations
-                agg_dict = {}
-                for col, func in aggregation.items():
-                    if col == '*':
-                        # Count all rows
-                        agg_dict['count'] = 'count'
-                    else:
-                        agg_dict[col] = func
-                
-                result_df = result_df.groupby(grouping).agg(agg_dict).reset_index()
+                # (observed=True: categorical keys group on their codes and skip empty categories)
+                grouped = result_df.groupby(grouping, observed=True)
+                col, func = next(iter(agg_dict.items()))
+                if (len(agg_dict) == 1 and isinstance(func, str) and func in GROUPBY_REDUCTIONS
+                        and col in result_df.columns):
+                    # A single named reduction calls the groupby method directly
+                    result_df = getattr(grouped[col], func)().reset_index()
+                else:
+                    result_df = grouped.agg(agg_dict).reset_index()
                 
                 log_entries.append({
                     'step': 'grouping_aggregation',
@@ -602,13 +862,6 @@ class SAPQueryExecutor:
             
             elif aggregation and not grouping:
                 # Apply aggregations without grouping
-                agg_dict = {}
-                for col, func in aggregation.items():
-                    if col == '*':
-                        agg_dict['count'] = 'count'
-                    else:
-                        agg_dict[col] = func
-                
                 result_df = result_df.agg(agg_dict).to_frame().T
                 
                 log_entries.append({
@@ -623,7 +876,7 @@ class SAPQueryExecutor:
             
             elif grouping and not aggregation:
                 # Just group by (count by default)
-                result_df = result_df.groupby(grouping).size().reset_index(name='count')
+                result_df = result_df.groupby(grouping, observed=True).size().reset_index(name='count')
                 
                 log_entries.append({
                     'step': 'grouping',
@@ -644,9 +897,52 @@ class SAPQueryExecutor:
         
         return result_df, log_entries
     
-    def _apply_sorting(self, df: pd.DataFrame, sorting: List[Dict[str, Any]]) -> Tuple[pd.DataFrame, List[Dict[str, Any]]]:
-        """Apply sorting to the dataframe"""
-        result_df = df.copy()
+    def _build_agg_dict(self, aggregation: Dict[str, Any]) -> Dict[str, Any]:
+        """Column -> function mapping for pandas agg, with '*' counted as the 'count' column"""
+        agg_dict = {}
+        for col, func in aggregation.items():
+            if col == '*':
+                # Count all rows
+                agg_dict['count'] = 'count'
+            else:
+                agg_dict[col] = func
+        return agg_dict
+    
+    def _value_counts(self, series: pd.Series, limit: Optional[int] = None) -> pd.Series:
+        """value_counts().head(limit) that only orders the top values
+        
+        Ties keep first-appearance order and only observed values are counted,
+        so categorical columns give the same result as the strings they hold.
+        """
+        counts, uniques = self._distinct_counts(series)
+        return self._counts_to_series(counts, uniques, limit)
+    
+    def _distinct_counts(self, series: pd.Series) -> Tuple[np.ndarray, pd.Index]:
+        """Occurrences of each distinct non-null value, in order of first appearance"""
+        codes, uniques = series.factorize()
+        return np.bincount(codes[codes >= 0], minlength=len(uniques)), uniques
+    
+    def _counts_to_series(self, counts: np.ndarray, uniques: pd.Index, limit: Optional[int] = None) -> pd.Series:
+        """The limit most frequent values as a value_counts-style Series"""
+        if limit and limit < len(counts):
+            # Keep every value tied with the limit-th largest count, then order just those
+            kth_count = counts[np.argpartition(-counts, limit - 1)[limit - 1]]
+            candidates = np.flatnonzero(counts >= kth_count)
+            top = candidates[np.argsort(-counts[candidates], kind='stable')][:limit]
+        else:
+            top = np.argsort(-counts, kind='stable')
+        
+        return pd.Series(counts[top], index=uniques.take(top), name='count')
+    
+    def _top_value_counts(self, series: pd.Series, limit: Optional[int]) -> pd.DataFrame:
+        """Equivalent of value_counts().reset_index().head(limit)"""
+        value_counts = self._value_counts(series, limit)
+        return pd.DataFrame({series.name: value_counts.index, 'count': value_counts.to_numpy()})
+    
+    def _apply_sorting(self, df: pd.DataFrame, sorting: List[Dict[str, Any]],
+                       limit: Optional[int] = None) -> Tuple[pd.DataFrame, List[Dict[str, Any]]]:
+        """Apply sorting to the dataframe; with a limit, only the top rows need to be ordered"""
+        result_df = df
         log_entries = []
         
         try:
@@ -662,7 +958,15 @@ class SAPQueryExecutor:
                     ascending_flags.append(ascending)
             
             if sort_columns:
-                result_df = result_df.sort_values(sort_columns, ascending=ascending_flags)
+                keys = self._sort_keys(result_df, sort_columns, ascending_flags) if len(sort_columns) > 1 else None
+                top_rows = self._top_rows(result_df, sort_columns, ascending_flags, limit)
+                if top_rows is not None:
+                    result_df = top_rows
+                elif keys is not None:
+                    # np.lexsort treats its last key as the primary one
+                    result_df = result_df.iloc[np.lexsort(keys[::-1])]
+                else:
+                    result_df = result_df.sort_values(sort_columns, ascending=ascending_flags)
                 
                 log_entries.append({
                     'step': 'sorting',
@@ -682,10 +986,59 @@ class SAPQueryExecutor:
             })
         
         return result_df, log_entries
+
+    def _top_rows(self, df: pd.DataFrame, columns: List[str], ascending: List[bool],
+                  limit: Optional[int]) -> Optional[pd.DataFrame]:
+        """nlargest/nsmallest for a limited sort on one numeric column, or None to sort fully"""
+        if len(columns) != 1 or not isinstance(limit, int) or not 0 < limit < len(df):
+            return None
+        series = df[columns[0]]
+        if not (isinstance(series.dtype, np.dtype) and series.dtype.kind in 'if'):
+            return None
+        # nlargest drops missing values, which a full sort would place last
+        if series.count() < limit:
+            return None
+        
+        # Positions rather than labels, so duplicate index labels cannot widen the result
+        positions = series.reset_index(drop=True)
+        top = positions.nsmallest(limit) if ascending[0] else positions.nlargest(limit)
+        return df.iloc[top.index.to_numpy()]
+    
+    def _sort_keys(self, df: pd.DataFrame, columns: List[str], ascending: List[bool]) -> Optional[List[np.ndarray]]:
+        """Integer/float sort keys for a multi-column sort, or None when a column needs sort_values.
+
+        Categorical columns sort by their codes and plain numeric columns by their values;
+        missing values are mapped so they stay last in either direction, like sort_values.
+        """
+        keys = []
+        for column, asc in zip(columns, ascending):
+            series = df[column]
+            if isinstance(series.dtype, pd.CategoricalDtype):
+                codes = series.cat.codes.to_numpy()
+                key = codes if asc else -codes.astype(np.int64)
+                missing = codes < 0
+                if missing.any():
+                    key = np.where(missing, len(series.cat.categories) if asc else 1, key)
+            elif isinstance(series.dtype, np.dtype) and series.dtype.kind in 'if':
+                values = series.to_numpy()
+                if asc:
+                    key = values
+                elif series.dtype.kind == 'i':
+                    # Bitwise NOT reverses the order without overflowing at the dtype minimum
+                    # (negating a downcast int8 -128 would give -128 again)
+                    key = ~values.astype(np.int64)
+                else:
+                    # NaN stays NaN when negated, and lexsort puts it last
+                    key = -values.astype(np.float64)
+            else:
+                return None
+            keys.append(key)
+        return keys
     
     def _apply_limit(self, df: pd.DataFrame, limit: int) -> Tuple[pd.DataFrame, List[Dict[str, Any]]]:
         """Apply limit to the dataframe"""
-        result_df = df.head(limit)
+        # Positional slice; a limit covering the whole frame keeps it as is
+        result_df = df if isinstance(limit, int) and limit >= len(df) else df.iloc[:limit]
         log_entries = []
         
         log_entries.append({
@@ -704,23 +1057,29 @@ class SAPQueryExecutor:
                         execution_time: float, execution_log: List[Dict[str, Any]]) -> Dict[str, Any]:
         """Prepare the final results"""
         try:
+            column_names = result_df.columns.tolist()
+            
             # Convert dataframe to records for JSON serialization
             if len(result_df) > 0:
-                # Return as list of lists (row values) for frontend compatibility
-                result_records = []
-                for _, row in result_df.iterrows():
-                    record = []
-                    for col in result_df.columns:
-                        value = row[col]
-                        if pd.isna(value):
-                            record.append(None)
-                        elif isinstance(value, (datetime, pd.Timestamp)):
-                            record.append(value.isoformat())
-                        elif isinstance(value, (np.integer, np.floating)):
-                            record.append(float(value))
-                        else:
-                            record.append(str(value))
-                    result_records.append(record)
+                # Build the list of lists (row values) the frontend expects; a frame whose
+                # values interleave to a numeric array is returned as floats throughout
+                dtypes = list(result_df.dtypes)
+                if all(isinstance(dtype, np.dtype) for dtype in dtypes):
+                    numeric_frame = all(dtype.kind in 'iuf' for dtype in dtypes)
+                else:
+                    # Categorical and nullable columns interleave depending on their values
+                    numeric_frame = result_df.to_numpy().dtype.kind in 'iuf'
+                if numeric_frame:
+                    # One float64 block turned into row lists by a single tolist(); only the
+                    # missing cells are then patched to None
+                    values = result_df.to_numpy(dtype=np.float64, na_value=np.nan)
+                    result_records = values.tolist()
+                    for row, col in zip(*(index.tolist() for index in np.nonzero(np.isnan(values)))):
+                        result_records[row][col] = None
+                else:
+                    # Mixed frames convert column by column, then zip the columns into rows
+                    columns = [self._column_records(result_df.iloc[:, i]) for i in range(len(column_names))]
+                    result_records = [list(row) for row in zip(*columns)]
             else:
                 result_records = []
             
@@ -728,12 +1087,12 @@ class SAPQueryExecutor:
             summary_stats = self._generate_summary_stats(result_df, query_plan)
             
             # Generate insights
-            insights = self._generate_insights(result_df, query_plan)
+            insights = self._generate_insights(result_df, query_plan, summary_stats.get('column_stats'))
             
             return {
                 'status': 'success',
                 'data': result_records,
-                'columns': list(result_df.columns),
+                'columns': column_names,
                 'row_count': len(result_df),
                 'execution_time': execution_time,
                 'execution_log': execution_log,
@@ -749,6 +1108,42 @@ class SAPQueryExecutor:
                 'message': f"Error preparing results: {str(e)}"
             }
     
+    def _column_records(self, series: pd.Series) -> List[Any]:
+        """JSON-ready values of one column of a mixed (not all-numeric) result frame"""
+        # In a mixed frame numpy columns arrive as Python scalars, so dispatch once on the
+        # column's dtype instead of per cell (NaN != NaN marks missing floats)
+        kind = series.dtype.kind if isinstance(series.dtype, np.dtype) else None
+        if kind in ('i', 'u', 'b'):
+            return [str(value) for value in series.tolist()]
+        if kind == 'f':
+            return [None if value != value else str(value) for value in series.tolist()]
+        if kind == 'M':
+            return [None if value is pd.NaT else value.isoformat() for value in series.tolist()]
+        if kind == 'm':
+            return [None if value is pd.NaT else str(value) for value in series.tolist()]
+        
+        # Text columns (plain or categorical) and nullable int/bool columns: one isna() mask
+        # for the column replaces the per-cell pd.isna checks
+        values_dtype = series.dtype.categories.dtype if isinstance(series.dtype, pd.CategoricalDtype) else series.dtype
+        if isinstance(values_dtype, pd.StringDtype):
+            missing = series.isna().to_numpy().tolist()
+            return [None if is_missing else value for value, is_missing in zip(series.tolist(), missing)]
+        if kind is None and series.dtype.kind in ('i', 'u', 'b'):
+            missing = series.isna().to_numpy().tolist()
+            return [None if is_missing else str(value) for value, is_missing in zip(series.tolist(), missing)]
+        return [self._json_value(value) for value in series.tolist()]
+    
+    def _json_value(self, value: Any) -> Any:
+        """JSON-ready form of a single result cell"""
+        if pd.isna(value):
+            return None
+        elif isinstance(value, (datetime, pd.Timestamp)):
+            return value.isoformat()
+        elif isinstance(value, (np.integer, np.floating)):
+            return float(value)
+        else:
+            return str(value)
+    
     def _generate_summary_stats(self, df: pd.DataFrame, query_plan: Dict[str, Any]) -> Dict[str, Any]:
         """Generate summary statistics for the results"""
         stats = {
@@ -759,47 +1154,74 @@ class SAPQueryExecutor:
         if len(df) == 0:
             return stats
         
+        # Reduce the plain numpy numeric result columns together: one min/max/mean/sum call
+        # each over the frame instead of four per column (nullable columns go one by one)
+        numeric_stats = {}
+        numeric_cols = [col for col in df.columns
+                        if self._column_categories.get(col) == 'numeric']
+        if len(set(numeric_cols)) == len(numeric_cols):
+            try:
+                numeric_df = pd.DataFrame({col: self._numeric_column(df, col) for col in numeric_cols})
+                numeric_df = numeric_df.loc[:, [isinstance(dtype, np.dtype) for dtype in numeric_df.dtypes]]
+                if len(numeric_df.columns):
+                    reductions = {
+                        'min': numeric_df.min(), 'max': numeric_df.max(),
+                        'mean': numeric_df.mean(), 'sum': numeric_df.sum()
+                    }
+                    numeric_stats = {col: {name: float(values[col]) for name, values in reductions.items()}
+                                     for col in numeric_df.columns}
+            except:
+                numeric_stats = {}
+        
         # Add column-specific statistics
         column_stats = {}
         for col in df.columns:
-            col_info = self.column_analysis.get(col, {})
+            category = self._column_categories.get(col)
             
-            if col_info.get('data_category') == 'numeric':
+            if category == 'numeric':
                 try:
-                    numeric_col = pd.to_numeric(df[col], errors='coerce')
-                    column_stats[col] = {
-                        'min': float(numeric_col.min()),
-                        'max': float(numeric_col.max()),
-                        'mean': float(numeric_col.mean()),
-                        'sum': float(numeric_col.sum())
-                    }
+                    if col in numeric_stats:
+                        column_stats[col] = numeric_stats[col]
+                    else:
+                        numeric_col = self._numeric_column(df, col)
+                        column_stats[col] = {
+                            'min': float(numeric_col.min()),
+                            'max': float(numeric_col.max()),
+                            'mean': float(numeric_col.mean()),
+                            'sum': float(numeric_col.sum())
+                        }
                 except:
                     pass
-            elif col_info.get('data_category') == 'date':
+            elif category == 'date':
                 try:
-                    date_col = pd.to_datetime(df[col], errors='coerce')
+                    date_col = df[col]
+                    if not pd.api.types.is_datetime64_any_dtype(date_col):
+                        date_col = pd.to_datetime(date_col, errors='coerce')
+                    min_date, max_date = date_col.min(), date_col.max()
                     column_stats[col] = {
-                        'min_date': date_col.min().isoformat(),
-                        'max_date': date_col.max().isoformat(),
-                        'date_range_days': (date_col.max() - date_col.min()).days
+                        'min_date': min_date.isoformat(),
+                        'max_date': max_date.isoformat(),
+                        'date_range_days': (max_date - min_date).days
                     }
                 except:
                     pass
-            elif col_info.get('data_category') == 'categorical':
+            elif category == 'categorical':
                 try:
-                    value_counts = df[col].value_counts()
+                    # Only the top 5 are ordered (argpartition), not every distinct value
+                    counts, uniques = self._distinct_counts(df[col])
+                    value_counts = self._counts_to_series(counts, uniques, 5)
                     # Convert numpy types to native Python types for JSON serialization
                     top_values = {}
-                    for key, value in value_counts.head(5).items():
+                    for key, value in value_counts.items():
                         if pd.isna(key):
                             top_values['null'] = int(value)
                         elif isinstance(key, (np.integer, np.floating)):
                             top_values[str(float(key))] = int(value)
                         else:
                             top_values[str(key)] = int(value)
-                    # Fix: ensure unique_values is an int, not a dict
                     column_stats[col] = {
-                        'unique_values': int(value_counts.nunique()),
+                        # Distinct non-null values (not distinct counts, as value_counts().nunique() gave)
+                        'unique_values': int(counts.size),
                         'top_values': top_values
                     }
                 except Exception as e:
@@ -811,9 +1233,18 @@ class SAPQueryExecutor:
         stats['column_stats'] = column_stats
         return stats
     
-    def _generate_insights(self, df: pd.DataFrame, query_plan: Dict[str, Any]) -> List[str]:
-        """Generate insights about the results"""
+    def _numeric_column(self, df: pd.DataFrame, col: str) -> pd.Series:
+        """A numeric column as numbers; columns typed during preprocessing are used as they are"""
+        series = df[col]
+        if pd.api.types.is_numeric_dtype(series):
+            return series
+        return pd.to_numeric(series, errors='coerce')
+    
+    def _generate_insights(self, df: pd.DataFrame, query_plan: Dict[str, Any],
+                           column_stats: Optional[Dict[str, Any]] = None) -> List[str]:
+        """Generate insights about the results, reusing reductions from the summary column_stats"""
         insights = []
+        column_stats = column_stats or {}
         
         if len(df) == 0:
             insights.append("No data matches the specified criteria")
@@ -827,122 +1258,71 @@ class SAPQueryExecutor:
             for col, func in query_plan['aggregation'].items():
                 if col in df.columns and func in ['sum', 'mean']:
                     try:
-                        value = df[col].iloc[0] if len(df) == 1 else df[col].sum()
+                        if len(df) == 1:
+                            value = df[col].iloc[0]
+                        elif 'sum' in column_stats.get(col, {}) and pd.api.types.is_numeric_dtype(df[col]):
+                            value = column_stats[col]['sum']
+                        else:
+                            value = df[col].sum()
                         insights.append(f"Total {func} of {col}: {value:,.2f}")
                     except:
                         pass
         
         # Add insights based on data patterns
         for col in df.columns:
-            col_info = self.column_analysis.get(col, {})
-            
-            if col_info.get('data_category') == 'numeric':
+            if self._column_categories.get(col) == 'numeric':
                 try:
-                    numeric_col = pd.to_numeric(df[col], errors='coerce')
-                    if numeric_col.max() > numeric_col.mean() * 3:
+                    stats = column_stats.get(col, {})
+                    if 'max' in stats and 'mean' in stats:
+                        col_max, col_mean = stats['max'], stats['mean']
+                    else:
+                        numeric_col = self._numeric_column(df, col)
+                        col_max, col_mean = numeric_col.max(), numeric_col.mean()
+                    if col_max > col_mean * 3:
                         insights.append(f"High variance detected in {col} - some values are significantly above average")
                 except:
                     pass
         
         return insights
     
-    def _find_date_column(self) -> Optional[str]:
-        """Find the date column"""
-        for col_name, col_info in self.column_analysis.items():
-            if 'posting_date' in col_info.get('sap_patterns', []):
-                return col_name
-        return None 
-    
-    def _find_vendor_column(self) -> Optional[str]:
-        """Find the vendor column"""
-        for col_name, col_info in self.column_analysis.items():
-            if 'vendor_number' in col_info.get('sap_patterns', []):
-                return col_name
-        return None
-    
-    def _find_customer_column(self) -> Optional[str]:
-        """Find the customer column"""
-        for col_name, col_info in self.column_analysis.items():
-            if 'customer_number' in col_info.get('sap_patterns', []):
-                return col_name
-        return None
-    
-    def _find_amount_column(self) -> Optional[str]:
-        """Find the amount column"""
+    def _find_sap_columns(self) -> Dict[str, Optional[str]]:
+        """Find the date, vendor, customer and amount columns in one pass (first match wins)"""
+        found = dict.fromkeys(SAP_COLUMN_ROLES)
         for col_name, col_info in self.column_analysis.items():
-            if any(pattern in col_info.get('sap_patterns', []) for pattern in ['local_amount', 'document_amount']):
-                return col_name
-        return None 
+            patterns = col_info.get('sap_patterns', [])
+            for role, role_patterns in SAP_COLUMN_ROLES.items():
+                if found[role] is None and any(pattern in patterns for pattern in role_patterns):
+                    found[role] = col_name
+        return found
 
     def _generate_natural_language_response(self, question: str, response_type: str, context: Dict) -> str:
         """Generate natural language responses for different question types with Navy/DoD context"""
         try:
+            question_lower = question.lower()
+            is_navy = any(keyword in question_lower for keyword in NAVY_KEYWORDS)
+            
             if response_type == 'schema':
                 table_type = context.get('table_type', 'UNKNOWN')
-                total_rows = context.get('total_rows', 0)
-                total_columns = context.get('total_columns', 0)
-                schema_summary = context.get('schema_summary', '')
-                
                 # Generate natural language response based on question type with Navy context
-                if 'what does' in question.lower() or 'what is' in question.lower():
-                    if 'navy' in question.lower() or 'military' in question.lower() or 'dod' in question.lower():
-                        if table_type == 'BSEG':
-                            return f"This is a **BSEG (Accounting Document Segment)** table containing {total_rows:,} individual financial transaction line items. As a Navy professional, you can use this data for:\n• Tracking Navy procurement and vendor payments\n• Monitoring budget execution across commands\n• Auditing financial transactions for DoD compliance\n• Analyzing spending patterns by appropriation categories\n• Supporting Navy financial reporting requirements\n\n{schema_summary}"
-                        elif table_type == 'BKPF':
-                            return f"This is a **BKPF (Accounting Document Header)** table containing {total_rows:,} complete accounting documents. For Navy operations, this supports:\n• Document-level audit trails for DoD compliance\n• Approval workflow tracking for Navy acquisitions\n• Financial reporting for Navy commands and programs\n• Budget execution monitoring and analysis\n• Supporting Navy financial transparency initiatives\n\n{schema_summary}"
-                        else:
-                            return f"This is a **{table_type}** table with {total_rows:,} records and {total_columns} columns. For Navy and DoD operations, this data supports:\n• Financial analysis and reporting requirements\n• Compliance monitoring and audit preparation\n• Budget execution and appropriation tracking\n• Navy-specific procurement and vendor management\n\n{schema_summary}"
-                    else:
-                        if table_type == 'BSEG':
-                            return f"This is a **BSEG (Accounting Document Segment)** table that contains {total_rows:,} individual line items from accounting documents. Each row represents a single financial transaction entry with {total_columns} different data fields. This table is used for detailed financial analysis, transaction tracking, and audit purposes. {schema_summary}"
-                        elif table_type == 'BKPF':
-                            return f"This is a **BKPF (Accounting Document Header)** table that contains {total_rows:,} complete accounting documents. Each row represents a full financial document with {total_columns} different data fields. This table is used for document-level analysis, approval workflows, and compliance reporting. {schema_summary}"
-                        else:
-                            return f"This is a **{table_type}** table containing {total_rows:,} records with {total_columns} columns of data. {schema_summary}"
-                
-                elif 'explain' in question.lower() or 'describe' in question.lower():
-                    if 'navy' in question.lower() or 'military' in question.lower() or 'dod' in question.lower():
-                        return f"Let me explain this {table_type} table for Navy operations: It contains {total_rows:,} records with {total_columns} columns. {schema_summary} You can use this data for Navy financial analysis, DoD compliance reporting, budget execution monitoring, and supporting Navy acquisition processes."
-                    else:
-                        return f"Let me explain this {table_type} table: It contains {total_rows:,} records with {total_columns} columns. {schema_summary} You can use this data for financial analysis, reporting, and business intelligence purposes."
-                
+                if 'what does' in question_lower or 'what is' in question_lower:
+                    intent = 'what'
+                    table_key = table_type if table_type in ('BSEG', 'BKPF') else None
+                elif 'explain' in question_lower or 'describe' in question_lower:
+                    intent, table_key = 'explain', None
                 else:
-                    return f"This {table_type} table has {total_rows:,} records and {total_columns} columns. {schema_summary}"
+                    intent, table_key, is_navy = 'other', None, False
+                
+                return SCHEMA_RESPONSES[(intent, is_navy, table_key)].format(
+                    table_type=table_type,
+                    total_rows=context.get('total_rows', 0),
+                    total_columns=context.get('total_columns', 0),
+                    schema_summary=context.get('schema_summary', '')
+                )
             
             elif response_type == 'business':
-                insights = context.get('insights', '')
-                question_lower = question.lower()
-                
-                if 'navy' in question_lower or 'military' in question_lower or 'dod' in question_lower:
-                    if 'overdue' in question_lower:
-                        return f"Based on your Navy-related question about overdue items: {insights} This analysis helps identify items that need attention for Navy payment processing, vendor management, and cash flow management across Navy commands."
-                    
-                    elif 'vendor' in question_lower:
-                        return f"Regarding your Navy vendor-related question: {insights} This information helps you understand Navy vendor relationships, procurement patterns, and supports Navy acquisition compliance."
-                    
-                    elif 'customer' in question_lower:
-                        return f"About your Navy customer inquiry: {insights} This data provides insights into Navy customer relationships, inter-command transactions, and Navy financial patterns."
-                    
-                    elif 'invoice' in question_lower or 'payment' in question_lower:
-                        return f"For your Navy financial question: {insights} This analysis helps understand Navy payment patterns, budget execution, and financial performance across Navy programs."
-                    
-                    else:
-                        return f"Here's what I found based on your Navy-related question: {insights} This information provides valuable insights for Navy decision-making, budget management, and DoD compliance."
-                else:
-                    if 'overdue' in question_lower:
-                        return f"Based on your question about overdue items, here's what I found: {insights} This analysis helps identify items that need attention for payment processing and cash flow management."
-                    
-                    elif 'vendor' in question_lower:
-                        return f"Regarding your vendor-related question: {insights} This information can help you understand vendor relationships and payment patterns."
-                    
-                    elif 'customer' in question_lower:
-                        return f"About your customer inquiry: {insights} This data provides insights into customer relationships and transaction patterns."
-                    
-                    elif 'invoice' in question_lower or 'payment' in question_lower:
-                        return f"For your financial question: {insights} This analysis helps understand payment patterns and financial performance."
-                    
-                    else:
-                        return f"Here's what I found based on your question: {insights} This information provides valuable business insights for decision-making."
+                topic = next((topic for topic, keywords in BUSINESS_TOPICS
+                              if any(keyword in question_lower for keyword in keywords)), 'general')
+                return BUSINESS_RESPONSES[(is_navy, topic)].format(insights=context.get('insights', ''))
             
             else:
                 return "I've analyzed your question and provided relevant insights based on the available data."
@@ -218,7 +218,7 @@ class SAPQueryRouter:
         data = {
             'document_type_distribution': doc_type_counts,
             'total_documents': len(self.data_manager.bkpf_df),
-            'date_range': f"{self.data_manager.bkpf_df['BUDAT'].min()} to {self.data_manager.bkpf_df['BUDAT'].max()}"
+            'date_range': self.data_manager.get_date_range()
         }
         
         return {
@@ -3,7 +3,7 @@ SAP AI Demo - Report Identifier
 Identifies SAP report types based on column patterns in uploaded CSV files
 """
 
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Set
 import logging
 
 class SAPReportIdentifier:
@@ -67,6 +67,12 @@ class SAPReportIdentifier:
                 'confidence_threshold': 0.8
             }
         }
+        
+        # Column sets per table type, built once for O(1) membership checks
+        self.pattern_columns = {
+            table_type: frozenset(pattern['required_columns'] + pattern['optional_columns'])
+            for table_type, pattern in self.table_patterns.items()
+        }
     
     def identify_report_type(self, columns: List[str]) -> Dict[str, any]:
         """
@@ -81,12 +87,13 @@ class SAPReportIdentifier:
         try:
             # Normalize column names (uppercase, remove spaces)
             normalized_columns = [col.upper().strip() for col in columns]
+            column_set = set(normalized_columns)
             
             best_match = None
             highest_confidence = 0.0
             
             for table_type, pattern in self.table_patterns.items():
-                confidence = self._calculate_confidence(normalized_columns, pattern)
+                confidence = self._calculate_confidence(column_set, pattern)
                 
                 if confidence > highest_confidence and confidence >= pattern['confidence_threshold']:
                     highest_confidence = confidence
@@ -94,9 +101,9 @@ class SAPReportIdentifier:
                         'table_type': table_type,
                         'confidence': confidence,
                         'description': pattern['description'],
-                        'matched_columns': self._get_matched_columns(normalized_columns, pattern),
-                        'missing_columns': self._get_missing_columns(normalized_columns, pattern),
-                        'extra_columns': self._get_extra_columns(normalized_columns, pattern)
+                        'matched_columns': self._get_matched_columns(normalized_columns, table_type),
+                        'missing_columns': self._get_missing_columns(column_set, pattern),
+                        'extra_columns': self._get_extra_columns(normalized_columns, table_type)
                     }
             
             if best_match:
@@ -124,12 +131,12 @@ class SAPReportIdentifier:
                 'extra_columns': []
             }
     
-    def _calculate_confidence(self, columns: List[str], pattern: Dict) -> float:
+    def _calculate_confidence(self, columns: Set[str], pattern: Dict) -> float:
         """
         Calculate confidence score for a table pattern match
         
         Args:
-            columns: List of normalized column names
+            columns: Set of normalized column names
             pattern: Table pattern dictionary
             
         Returns:
@@ -158,19 +165,19 @@ class SAPReportIdentifier:
         
         return confidence
     
-    def _get_matched_columns(self, columns: List[str], pattern: Dict) -> List[str]:
+    def _get_matched_columns(self, columns: List[str], table_type: str) -> List[str]:
         """Get list of columns that match the pattern"""
-        all_pattern_columns = pattern['required_columns'] + pattern['optional_columns']
-        return [col for col in columns if col in all_pattern_columns]
+        pattern_columns = self.pattern_columns[table_type]
+        return [col for col in columns if col in pattern_columns]
     
-    def _get_missing_columns(self, columns: List[str], pattern: Dict) -> List[str]:
+    def _get_missing_columns(self, columns: Set[str], pattern: Dict) -> List[str]:
         """Get list of required columns that are missing"""
         return [col for col in pattern['required_columns'] if col not in columns]
     
-    def _get_extra_columns(self, columns: List[str], pattern: Dict) -> List[str]:
+    def _get_extra_columns(self, columns: List[str], table_type: str) -> List[str]:
         """Get list of columns not in the pattern"""
-        all_pattern_columns = pattern['required_columns'] + pattern['optional_columns']
-        return [col for col in columns if col not in all_pattern_columns]
+        pattern_columns = self.pattern_columns[table_type]
+        return [col for col in columns if col not in pattern_columns]
     
     def get_table_description(self, table_type: str) -> str:
         """
@@ -260,8 +267,8 @@ class SAPReportIdentifier:
         pattern = self.table_patterns[table_type]
         normalized_columns = [col.upper().strip() for col in columns]
         
-        missing_required = self._get_missing_columns(normalized_columns, pattern)
-        extra_columns = self._get_extra_columns(normalized_columns, pattern)
+        missing_required = self._get_missing_columns(set(normalized_columns), pattern)
+        extra_columns = self._get_extra_columns(normalized_columns, table_type)
         
         issues = []
         if missing_required:
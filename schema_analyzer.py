@@ -4,9 +4,12 @@ Handles loading and querying mock SAP data with performance optimizations
 """
 
 import pandas as pd
+import numpy as np
 import os
+import copy
 from datetime import datetime, timedelta
 import logging
+import hashlib
 from typing import Dict, List, Any, Optional
 
 class SAPDataManager:
@@ -151,94 +154,175 @@ class SAPDataManager:
             'transaction_count': len(account_transactions)
         }
 
+# Known SAP field names and the pattern each one indicates
+SAP_FIELD_PATTERNS = {
+    'BUKRS': 'company_code',
+    'BELNR': 'document_number',
+    'GJAHR': 'fiscal_year',
+    'BLART': 'document_type',
+    'BUDAT': 'posting_date',
+    'WAERS': 'currency',
+    'LIFNR': 'vendor_number',
+    'KUNNR': 'customer_number',
+    'KONTO': 'gl_account',
+    'SHKZG': 'debit_credit_indicator',
+    'DMBTR': 'local_amount',
+    'WRBTR': 'document_amount'
+}
+
+def file_content_hash(file_path: str) -> str:
+    """blake2b digest of a file's contents"""
+    with open(file_path, 'rb') as f:
+        return hashlib.file_digest(f, 'blake2b').hexdigest()
+
+# Rows per chunk when counting the full file
+ROW_COUNT_CHUNK_SIZE = 100_000
+
 class SAPSchemaAnalyzer:
     def __init__(self):
         self.logger = logging.getLogger(__name__)
         self._cache = {}  # Performance cache
         
-    def analyze_csv_file(self, file_path: str, sample_size: int = 5000) -> Dict[str, Any]:
+    def analyze_csv_file(self, file_path: str, sample_size: int = 5000,
+                         content_hash: Optional[str] = None) -> Dict[str, Any]:
         """
         Analyze a CSV file and return comprehensive schema metadata (Optimized)
         
         Args:
             file_path: Path to the CSV file
             sample_size: Number of rows to sample for analysis (reduced for performance)
+            content_hash: Digest of the file contents, computed here if not given
             
         Returns:
             Dictionary containing schema analysis results
         """
         try:
-            # Check cache first
-            cache_key = f"{file_path}_{os.path.getmtime(file_path)}"
+            # Check cache first; keyed by content so re-uploads of the same file hit
+            cache_key = f"{content_hash or file_content_hash(file_path)}_{sample_size}"
             if cache_key in self._cache:
                 self.logger.info("Using cached schema analysis")
-                return self._cache[cache_key]
+                # Callers annotate the result, so hand out a copy rather than the cached dict
+                return copy.deepcopy(self._cache[cache_key])
             
             # Read the CSV file efficiently
-            df = pd.read_csv(file_path, nrows=sample_size)  # Limit initial read
+            df = pd.read_csv(file_path, nrows=sample_size, engine='c', memory_map=True)  # Limit initial read
             
-            # Get basic file info quickly
-            total_rows = len(pd.read_csv(file_path, nrows=None))  # Get actual count
-            total_columns = len(df.columns)
+            # Count rows in chunks over a single column so the full file is never held in memory
+            total_rows = sum(
+                len(chunk) for chunk in pd.read_csv(
+                    file_path, usecols=[0], chunksize=ROW_COUNT_CHUNK_SIZE, engine='c', memory_map=True
+                )
+            )
             
-            # Use smaller sample for analysis
-            if total_rows > sample_size:
-                df_sample = df.sample(n=min(sample_size, len(df)), random_state=42)
-                self.logger.info(f"Analyzing sample of {len(df_sample)} rows from {total_rows} total rows")
-            else:
-                df_sample = df
-                
-            # Quick column analysis (optimized)
-            column_analysis = self._analyze_columns_fast(df_sample, df)
+            analysis_result = self._analyze_head(
+                df, total_rows, round(os.path.getsize(file_path) / 1024 / 1024, 2), sample_size
+            )
             
-            # Detect SAP table type
-            sap_table_type = self._detect_sap_table_type_fast(df.columns, column_analysis)
+            # Cache a copy of the result, kept apart from the one returned
+            self._cache[cache_key] = copy.deepcopy(analysis_result)
             
-            # Generate basic insights (minimal processing)
-            data_insights = self._generate_basic_insights(df_sample, column_analysis)
+            self.logger.info(f"Schema analysis completed for {file_path}")
+            return analysis_result
             
-            # Create query suggestions
-            query_suggestions = self._generate_query_suggestions_fast(sap_table_type, column_analysis, data_insights)
+        except Exception as e:
+            self.logger.error(f"Error analyzing CSV file {file_path}: {str(e)}")
+            raise
+    
+    def analyze_dataframe(self, df: pd.DataFrame, file_size_mb: float, sample_size: int = 5000,
+                          content_hash: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Analyze an already loaded DataFrame; same result as analyze_csv_file without re-reading the file
+        
+        Args:
+            df: The full uploaded DataFrame
+            file_size_mb: Size of the source file in MB
+            sample_size: Number of rows to sample for analysis (reduced for performance)
+            content_hash: Digest of the source file, used as the cache key when given
             
-            analysis_result = {
-                'file_info': {
-                    'total_rows': total_rows,
-                    'total_columns': total_columns,
-                    'file_size_mb': round(os.path.getsize(file_path) / 1024 / 1024, 2),
-                    'analyzed_rows': len(df_sample)
-                },
-                'sap_table_type': sap_table_type,
-                'column_analysis': column_analysis,
-                'data_insights': data_insights,
-                'query_suggestions': query_suggestions,
-                'schema_summary': self._create_schema_summary_fast(column_analysis, sap_table_type)
-            }
+        Returns:
+            Dictionary containing schema analysis results
+        """
+        try:
+            cache_key = f"{content_hash}_{sample_size}" if content_hash else None
+            if cache_key in self._cache:
+                self.logger.info("Using cached schema analysis")
+                # Callers annotate the result, so hand out a copy rather than the cached dict
+                return copy.deepcopy(self._cache[cache_key])
             
-            # Cache the result
-            self._cache[cache_key] = analysis_result
+            analysis_result = self._analyze_head(df.head(sample_size), len(df), file_size_mb, sample_size)
             
-            self.logger.info(f"Schema analysis completed for {file_path}")
+            if cache_key:
+                self._cache[cache_key] = copy.deepcopy(analysis_result)
+            
+            self.logger.info("Schema analysis completed for uploaded dataframe")
             return analysis_result
             
         except Exception as e:
-            self.logger.error(f"Error analyzing CSV file {file_path}: {str(e)}")
+            self.logger.error(f"Error analyzing dataframe: {str(e)}")
             raise
     
+    def _analyze_head(self, df: pd.DataFrame, total_rows: int, file_size_mb: float,
+                      sample_size: int) -> Dict[str, Any]:
+        """Build the schema analysis from the first sample_size rows of a file"""
+        total_columns = len(df.columns)
+        
+        # Use smaller sample for analysis
+        if total_rows > sample_size:
+            df_sample = df.sample(n=min(sample_size, len(df)), random_state=42)
+            self.logger.info(f"Analyzing sample of {len(df_sample)} rows from {total_rows} total rows")
+        else:
+            df_sample = df
+            
+        # Quick column analysis (optimized)
+        column_analysis = self._analyze_columns_fast(df_sample, df)
+        
+        # Detect SAP table type
+        sap_table_type = self._detect_sap_table_type_fast(df.columns, column_analysis)
+        
+        # Generate basic insights (minimal processing)
+        data_insights = self._generate_basic_insights(df_sample, column_analysis)
+        
+        # Create query suggestions
+        query_suggestions = self._generate_query_suggestions_fast(sap_table_type, column_analysis, data_insights)
+        
+        return {
+            'file_info': {
+                'total_rows': total_rows,
+                'total_columns': total_columns,
+                'file_size_mb': file_size_mb,
+                'analyzed_rows': len(df_sample)
+            },
+            'sap_table_type': sap_table_type,
+            'column_analysis': column_analysis,
+            'data_insights': data_insights,
+            'query_suggestions': query_suggestions,
+            'schema_summary': self._create_schema_summary_fast(column_analysis, sap_table_type)
+        }
+    
     def _analyze_columns_fast(self, df_sample: pd.DataFrame, df_full: pd.DataFrame) -> Dict[str, Any]:
         """Fast column analysis with minimal processing"""
         column_analysis = {}
         
-        for column in df_sample.columns:
+        # Null/unique counts and percentages for every column in one vectorized pass
+        row_count = len(df_sample)
+        null_counts = df_sample.isna().sum(axis=0).to_numpy()
+        unique_counts = df_sample.nunique().to_numpy()
+        null_pcts = np.round(null_counts / row_count * 100, 2)
+        unique_pcts = np.round(unique_counts / row_count * 100, 2)
+        
+        for column, dtype, null_count, null_pct, unique_count, unique_pct in zip(
+            df_sample.columns, df_sample.dtypes, null_counts, null_pcts, unique_counts, unique_pcts
+        ):
             col_data = df_sample[column]
             
             # Basic column info (fast)
             col_info = {
                 'name': column,
-                'dtype': str(col_data.dtype),
-                'null_count': col_data.isnull().sum(),
-                'null_percentage': round((col_data.isnull().sum() / len(col_data)) * 100, 2),
-                'unique_count': col_data.nunique(),
-                'unique_percentage': round((col_data.nunique() / len(col_data)) * 100, 2)
+                'dtype': str(dtype),
+                'null_count': null_count,
+                'null_percentage': null_pct,
+                'unique_count': int(unique_count),
+                'unique_percentage': float(unique_pct)
             }
             
             # Quick data type detection
@@ -288,16 +372,19 @@ class SAPSchemaAnalyzer:
     
     def _analyze_numeric_column_fast(self, col_data: pd.Series) -> Dict[str, Any]:
         """Fast numeric column analysis"""
-        clean_data = pd.to_numeric(col_data, errors='coerce').dropna()
+        values = pd.to_numeric(col_data, errors='coerce').to_numpy(dtype=np.float64)
+        clean_data = values[~np.isnan(values)]
         
         if len(clean_data) == 0:
             return {}
         
+        # Reduce over the raw array once; mean is derived from the sum
+        total = clean_data.sum()
         return {
             'min': float(clean_data.min()),
             'max': float(clean_data.max()),
-            'mean': float(clean_data.mean()),
-            'sum': float(clean_data.sum())
+            'mean': float(total / len(clean_data)),
+            'sum': float(total)
         }
     
     def _analyze_date_column_fast(self, col_data: pd.Series) -> Dict[str, Any]:
@@ -318,30 +405,14 @@ class SAPSchemaAnalyzer:
         patterns = []
         column_upper = column_name.upper()
         
-        # Quick pattern matching
-        sap_patterns = {
-            'BUKRS': 'company_code',
-            'BELNR': 'document_number',
-            'GJAHR': 'fiscal_year',
-            'BLART': 'document_type',
-            'BUDAT': 'posting_date',
-            'WAERS': 'currency',
-            'LIFNR': 'vendor_number',
-            'KUNNR': 'customer_number',
-            'KONTO': 'gl_account',
-            'SHKZG': 'debit_credit_indicator',
-            'DMBTR': 'local_amount',
-            'WRBTR': 'document_amount'
-        }
-        
-        if column_upper in sap_patterns:
-            patterns.append(sap_patterns[column_upper])
+        if column_upper in SAP_FIELD_PATTERNS:
+            patterns.append(SAP_FIELD_PATTERNS[column_upper])
         
         return patterns
     
     def _detect_sap_table_type_fast(self, columns: List[str], column_analysis: Dict) -> str:
         """Fast SAP table type detection"""
-        column_names = [col.upper() for col in columns]
+        column_names = {col.upper() for col in columns}
         
         # Quick pattern matching
         if all(col in column_names for col in ['BUKRS', 'BELNR', 'GJAHR', 'BLART']):
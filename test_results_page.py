@@ -0,0 +1,31 @@
+"""
+SAP AI Demo - Results Paging Tests
+Checks that stored query results page the same for list and dict rows
+"""
+
+import unittest
+
+from app import results_page
+
+
+class ResultsPageTest(unittest.TestCase):
+    def test_list_rows(self):
+        last_result = {'columns': ['LIFNR', 'WRBTR'], 'data': [['V001', 100.0], ['V002', 200.0]]}
+        page = results_page(last_result, 0)
+        self.assertEqual(page['rows'], [['V001', '100.0'], ['V002', '200.0']])
+        self.assertFalse(page['has_more'])
+
+    def test_dict_rows(self):
+        # explain_schema and business_analysis results store one dict per row
+        last_result = {
+            'columns': ['analysis', 'nl_response'],
+            'data': [{'analysis': 'Vendor Analysis: 3 unique vendors', 'nl_response': 'Here is what I found'}]
+        }
+        page = results_page(last_result, 0)
+        self.assertEqual(page['columns'], ['analysis', 'nl_response'])
+        self.assertEqual(page['rows'], [['Vendor Analysis: 3 unique vendors', 'Here is what I found']])
+        self.assertEqual(page['row_count'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
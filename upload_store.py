@@ -0,0 +1,61 @@
+"""
+SAP AI Demo - Upload Store
+Thread-safe, size-bounded LRU map of session id -> per-session data (uploads, chat histories)
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+class SAPUploadStore:
+    def __init__(self, max_entries: int, on_evict: Optional[Callable[[str, Dict[str, Any]], None]] = None):
+        self.max_entries = max_entries
+        self.on_evict = on_evict
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+    
+    def __contains__(self, session_id) -> bool:
+        with self._lock:
+            return session_id in self._entries
+    
+    def __getitem__(self, session_id: str) -> Dict[str, Any]:
+        with self._lock:
+            self._entries.move_to_end(session_id)
+            return self._entries[session_id]
+    
+    def get(self, session_id: str, default=None):
+        with self._lock:
+            if session_id not in self._entries:
+                return default
+            return self[session_id]
+    
+    def __setitem__(self, session_id: str, file_data: Dict[str, Any]):
+        """Store an upload, evicting the least recently used sessions when over capacity"""
+        with self._lock:
+            self._entries[session_id] = file_data
+            self._entries.move_to_end(session_id)
+            evicted = []
+            while len(self._entries) > self.max_entries:
+                evicted.append(self._entries.popitem(last=False))
+        
+        # Run callbacks outside the lock; they may touch the filesystem
+        if self.on_evict:
+            for evicted_id, evicted_data in evicted:
+                self.on_evict(evicted_id, evicted_data)
+    
+    def pop(self, session_id: str, default=None):
+        with self._lock:
+            return self._entries.pop(session_id, default)
+    
+    def items(self):
+        """Snapshot of (session id, file data) pairs, oldest first"""
+        with self._lock:
+            return list(self._entries.items())
+    
+    def values(self):
+        with self._lock:
+            return list(self._entries.values())
+    
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)